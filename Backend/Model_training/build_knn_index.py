@@ -0,0 +1,102 @@
+"""
+Build the approximate nearest-neighbour index for the KNN member of the ML ensemble.
+
+This script:
+1. Loads Models/ml_ensemble_model.joblib and finds its fitted KNeighborsClassifier
+2. Projects the stored training rows onto a few PCA components and indexes them
+3. Benchmarks recall@k and query latency of the index against exact KNN search,
+   and how far the ensemble's AI probability moves when the index is used
+4. Saves the index to Models/ml_ensemble_knn_ann.joblib
+
+Run it whenever the ensemble is retrained and saved, then start the backend with:
+    ML_KNN_ANN=1 python app.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BASE_DIR)  # Go up from Model_training to Backend
+MODELS_DIR = os.path.join(BACKEND_DIR, "Models")
+sys.path.insert(0, BACKEND_DIR)
+
+from knn_index import ReducedKNNClassifier, find_knn_members, install_knn_index  # noqa: E402
+
+ENSEMBLE_PATH = os.path.join(MODELS_DIR, "ml_ensemble_model.joblib")
+INDEX_PATH = os.path.join(MODELS_DIR, "ml_ensemble_knn_ann.joblib")
+
+
+def benchmark(knn, ann, queries, k):
+    """recall@k and per-query latency (ms) of the index vs exact search"""
+    start = time.perf_counter()
+    _, exact = knn.kneighbors(queries, n_neighbors=k)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    _, approx = ann.kneighbors(queries, n_neighbors=k)
+    approx_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    recall = np.mean([len(set(e) & set(a)) / k for e, a in zip(exact, approx)])
+    return recall, exact_ms, approx_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--components', type=int, nargs='+', default=[8, 16, 32, 64],
+                        help='PCA sizes to benchmark; the last one is saved')
+    parser.add_argument('--backend', choices=['auto', 'hnsw', 'kd_tree'], default='auto')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧭 KNN APPROXIMATE INDEX")
+    print("=" * 60)
+
+    ensemble = joblib.load(ENSEMBLE_PATH)
+    members = find_knn_members(ensemble)
+    if not members:
+        print(f"❌ No fitted KNeighborsClassifier found in {ENSEMBLE_PATH}")
+        return False
+    container, i = members[0]
+    knn = container[i]
+    if isinstance(knn, ReducedKNNClassifier):
+        print(f"❌ {ENSEMBLE_PATH} was saved with the index already installed")
+        return False
+
+    fit_X = np.asarray(knn._fit_X)
+    print(f"\n📦 KNN member: {fit_X.shape[0]:,} rows x {fit_X.shape[1]} features, k={knn.n_neighbors}")
+
+    rng = np.random.default_rng(42)
+    sample = fit_X[rng.choice(len(fit_X), size=min(args.queries, len(fit_X)), replace=False)]
+    # Perturb the stored rows so queries are not trivially their own neighbours
+    queries = sample + rng.normal(0, 0.05, size=sample.shape)
+    exact_proba = ensemble.predict_proba(queries)[:, 1]
+
+    print(f"\n{'components':>10} {'backend':>8} {'recall@k':>9} {'exact ms':>9} {'ann ms':>8} {'max Δp':>8}")
+    ann = None
+    for n in args.components:
+        ann = ReducedKNNClassifier(knn, n_components=n, backend=args.backend)
+        recall, exact_ms, ann_ms = benchmark(knn, ann, queries, knn.n_neighbors)
+
+        install_knn_index(ensemble, ann)
+        drift = np.max(np.abs(ensemble.predict_proba(queries)[:, 1] - exact_proba))
+        install_knn_index(ensemble, knn)
+
+        print(f"{n:>10} {ann.backend:>8} {recall:>9.3f} {exact_ms:>9.3f} {ann_ms:>8.3f} {drift:>8.4f}")
+
+    if not args.no_save:
+        joblib.dump(ann, INDEX_PATH)
+        print(f"\n💾 Saved: {INDEX_PATH} ({ann.pca.n_components_} components, {ann.backend})")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,174 @@
+"""
+Compare the fp32 RoBERTa detector against its dynamic int8 quantized copy.
+
+Scores a labelled CSV through the backend's own pipeline (sentence chunks +
+whole-text chunk, calibration, blending with the ML ensemble when its
+artifacts are present), so the numbers describe the decisions the service
+makes, and reports:
+1. Accuracy of each variant at the backend's decision threshold
+2. Probability drift between the two (RoBERTa and final, mean / max absolute difference)
+3. Final decisions that flip across the threshold
+4. Per-text RoBERTa latency and process RSS after loading each variant
+
+Usage:
+    python compare_quantized.py data.csv --text-column cleaned_text --label-column source --limit 500
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BASE_DIR)  # Go up from Model_training to Backend
+
+# Import the backend for its scoring pipeline only: no model loading, and
+# chunks scored directly rather than through the cross-request scheduler
+os.environ.setdefault('DEFER_MODEL_LOADING', '1')
+os.environ.setdefault('INFERENCE_SCHEDULER', '0')
+sys.path.insert(0, BACKEND_DIR)
+import app  # noqa: E402
+
+MODEL_NAME = app.roberta_model_name
+THRESHOLD = app.DECISION_THRESHOLD
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux /proc, psutil elsewhere)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        return float('nan')
+
+
+def state_dict_size_mb(model):
+    """Serialized size of the model weights in MB"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def load_labels(csv_path, text_column, label_column, limit):
+    df = pd.read_csv(csv_path).dropna(subset=[text_column, label_column])
+    if limit:
+        df = df.sample(n=min(limit, len(df)), random_state=42)
+    texts = df[text_column].astype(str).tolist()
+    # 'human' -> 0, anything else (or numeric 1) -> 1, matching the training scripts
+    labels = df[label_column].apply(
+        lambda x: 0 if str(x).lower() in ('human', '0') else 1
+    ).values
+    return texts, labels
+
+
+def score(bundle, texts):
+    """Calibrated RoBERTa probability and latency (ms) for each text, chunked and scored as the backend does"""
+    probs, latencies = [], []
+    for text in texts:
+        text = app.normalize_text(text)
+        start = time.perf_counter()
+        doc = app.DocumentScore(bundle, text)
+        doc.score()
+        probs.append(app.calibrate_roberta(doc.prob()))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(probs), np.array(latencies)
+
+
+def final_probs(bundle, roberta_probs, ml_probs):
+    """The backend's combined probability for each text"""
+    return np.array([app.combine_probs(bundle, r, m) for r, m in zip(roberta_probs, ml_probs)])
+
+
+def report_variant(name, final, latencies, labels, rss_mb, size_mb):
+    accuracy = float(np.mean((final > THRESHOLD).astype(int) == labels))
+    print(f"\n📊 {name}")
+    print(f"   Accuracy @ {THRESHOLD}:  {accuracy:.4f}")
+    print(f"   Latency p50 / p95:  {np.percentile(latencies, 50):.1f} / {np.percentile(latencies, 95):.1f} ms")
+    print(f"   Mean latency:       {latencies.mean():.1f} ms")
+    print(f"   Weights size:       {size_mb:.1f} MB")
+    print(f"   Process RSS:        {rss_mb:.1f} MB")
+    return accuracy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('csv_path', help='Labelled CSV file')
+    parser.add_argument('--text-column', default='cleaned_text')
+    parser.add_argument('--label-column', default='source')
+    parser.add_argument('--limit', type=int, default=500, help='Sample size (0 = all rows)')
+    parser.add_argument('--model', default=MODEL_NAME, help='HF model name or local directory')
+    parser.add_argument('--threads', type=int, default=0, help='torch intra-op threads (0 = default)')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    print("=" * 60)
+    print("⚖️  FP32 vs DYNAMIC INT8 ROBERTA")
+    print("=" * 60)
+
+    texts, labels = load_labels(args.csv_path, args.text_column, args.label_column, args.limit)
+    print(f"\n📁 {os.path.basename(args.csv_path)}: {len(texts):,} texts")
+
+    model_path, tokenizer_path = app.resolve_roberta_source(args.model)
+    bundle = app.ModelBundle(args.model)
+    bundle.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+    # The ML ensemble is the same for both variants, so its probabilities are computed once
+    with contextlib.redirect_stdout(io.StringIO()):
+        app.load_ml_ensemble(bundle)
+        ml_probs = [app.ml_branch(bundle, app.normalize_text(text)) for text in texts]
+    print(f"   ML ensemble: {'blended' if bundle.ensemble else 'not available, RoBERTa only'}")
+    # No cross-text sentence reuse, so every text is scored in full
+    app.sentence_cache = app.LRUCache(0)
+
+    # fp32 first, so its RSS is not inflated by the quantized copy
+    bundle.model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    fp32_rss = current_rss_mb()
+    fp32_size = state_dict_size_mb(bundle.model)
+    score(bundle, texts[:3])  # warm-up
+    fp32_probs, fp32_latency = score(bundle, texts)
+    fp32_final = final_probs(bundle, fp32_probs, ml_probs)
+
+    bundle.model = torch.quantization.quantize_dynamic(bundle.model, {torch.nn.Linear}, dtype=torch.qint8)
+    int8_rss = current_rss_mb()
+    int8_size = state_dict_size_mb(bundle.model)
+    score(bundle, texts[:3])
+    int8_probs, int8_latency = score(bundle, texts)
+    int8_final = final_probs(bundle, int8_probs, ml_probs)
+
+    fp32_acc = report_variant("FP32", fp32_final, fp32_latency, labels, fp32_rss, fp32_size)
+    int8_acc = report_variant("INT8 (dynamic)", int8_final, int8_latency, labels, int8_rss, int8_size)
+
+    drift = np.abs(int8_probs - fp32_probs)
+    final_drift = np.abs(int8_final - fp32_final)
+    flips = int(np.sum((fp32_final > THRESHOLD) != (int8_final > THRESHOLD)))
+    near = int(np.sum(np.abs(fp32_final - THRESHOLD) < 0.05))
+
+    print("\n" + "=" * 60)
+    print("📋 SUMMARY")
+    print("=" * 60)
+    print(f"   Accuracy change:        {int8_acc - fp32_acc:+.4f}")
+    print(f"   RoBERTa drift:          mean {drift.mean():.4f} | max {drift.max():.4f}")
+    print(f"   Final drift:            mean {final_drift.mean():.4f} | max {final_drift.max():.4f}")
+    print(f"   Decision flips @ {THRESHOLD}:  {flips} / {len(texts)}")
+    print(f"   Texts within ±0.05 of threshold (fp32): {near}")
+    print(f"   Speed-up (mean):        {fp32_latency.mean() / int8_latency.mean():.2f}x")
+    print(f"   Weights size ratio:     {int8_size / fp32_size:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Export the RoBERTa detector to ONNX for the backend's ONNX Runtime backend.
+
+This script:
+1. Loads the model from Hugging Face or from the fine-tuned Models/roberta_finetuned
+   directory (the one validated by integrate_finetuned_model.py)
+2. Exports it to <output>/model.onnx with dynamic batch and sequence axes
+3. Saves the matching tokenizer next to the graph
+4. Checks ONNX Runtime output against PyTorch on sample inputs
+
+Then start the backend with:
+    pip install -r requirements-onnx.txt
+    INFERENCE_BACKEND=onnx python app.py
+
+Usage:
+    python export_onnx.py --source hf
+    python export_onnx.py --source finetuned
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BASE_DIR)  # Go up from Model_training to Backend
+MODELS_DIR = os.path.join(BACKEND_DIR, "Models")
+
+HF_MODEL_NAME = "Hello-SimpleAI/chatgpt-detector-roberta"
+FINETUNED_MODEL_PATH = os.path.join(MODELS_DIR, "roberta_finetuned")
+FINETUNED_TOKENIZER_PATH = os.path.join(MODELS_DIR, "roberta_finetuned_tokenizer")
+DEFAULT_OUTPUT = os.path.join(MODELS_DIR, "roberta_onnx")
+
+PARITY_SAMPLES = [
+    "This is a test sentence to verify the model works correctly.",
+    "In conclusion, the findings demonstrate a significant improvement across all evaluated metrics, "
+    "highlighting the importance of a comprehensive and multifaceted approach.",
+    "honestly i didnt think the movie was that good but my friends loved it lol",
+    "The mitochondria is the powerhouse of the cell. " * 40,
+]
+
+
+def resolve_source(source):
+    """Model and tokenizer locations for --source"""
+    if source == 'hf':
+        return HF_MODEL_NAME, HF_MODEL_NAME
+    if not os.path.exists(os.path.join(FINETUNED_MODEL_PATH, 'config.json')):
+        print(f"❌ Fine-tuned model not found at {FINETUNED_MODEL_PATH}")
+        print("   Run integrate_finetuned_model.py to check the model files.")
+        sys.exit(1)
+    tokenizer_path = FINETUNED_TOKENIZER_PATH if os.path.exists(FINETUNED_TOKENIZER_PATH) else FINETUNED_MODEL_PATH
+    return FINETUNED_MODEL_PATH, tokenizer_path
+
+
+def export(model, tokenizer, output_dir, opset):
+    os.makedirs(output_dir, exist_ok=True)
+    onnx_path = os.path.join(output_dir, "model.onnx")
+    sample = tokenizer(PARITY_SAMPLES[:2], return_tensors="pt", padding=True)
+
+    torch.onnx.export(
+        model,
+        (sample['input_ids'], sample['attention_mask']),
+        onnx_path,
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['logits'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'},
+        },
+        opset_version=opset,
+        do_constant_folding=True,
+    )
+    tokenizer.save_pretrained(output_dir)
+    size = os.path.getsize(onnx_path) / (1024 * 1024)
+    print(f"   ✅ Exported: {onnx_path} ({size:.1f} MB)")
+    return onnx_path
+
+
+def parity_check(model, tokenizer, onnx_path, tolerance):
+    """Max absolute difference of AI probabilities between PyTorch and ONNX Runtime"""
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    inputs = tokenizer(PARITY_SAMPLES, return_tensors="pt", padding=True, truncation=True, max_length=512)
+    with torch.no_grad():
+        torch_probs = torch.softmax(model(**inputs).logits, dim=-1)[:, 1].numpy()
+
+    feed = {name: inputs[name].numpy().astype(np.int64) for name in ('input_ids', 'attention_mask')}
+    logits = session.run(['logits'], feed)[0]
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    onnx_probs = (exp / exp.sum(axis=-1, keepdims=True))[:, 1]
+
+    for text, t, o in zip(PARITY_SAMPLES, torch_probs, onnx_probs):
+        print(f"   \"{text[:40]}...\"  torch={t:.6f}  onnx={o:.6f}")
+    max_diff = float(np.max(np.abs(torch_probs - onnx_probs)))
+    ok = max_diff <= tolerance
+    print(f"   Max |Δ prob| = {max_diff:.2e} ({'✅ within' if ok else '❌ above'} tolerance {tolerance:.0e})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=['hf', 'finetuned'], default='hf')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--opset', type=int, default=14)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    parser.add_argument('--skip-parity', action='store_true')
+    args = parser.parse_args()
+
+    model_path, tokenizer_path = resolve_source(args.source)
+
+    print("=" * 60)
+    print("📦 EXPORTING ROBERTA TO ONNX")
+    print("=" * 60)
+    print(f"\n📥 Model:     {model_path}")
+    print(f"📥 Tokenizer: {tokenizer_path}")
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    onnx_path = export(model, tokenizer, args.output, args.opset)
+
+    if args.skip_parity:
+        return True
+
+    print("\n🔬 Parity check (PyTorch vs ONNX Runtime)...")
+    return parity_check(model, tokenizer, onnx_path, args.tolerance)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,111 @@
+"""
+Save the RoBERTa detector as model.safetensors for memory-mapped loading.
+
+This script:
+1. Loads the model from Hugging Face or from the fine-tuned Models/roberta_finetuned
+   directory (the one validated by integrate_finetuned_model.py)
+2. Saves it to <output>/model.safetensors together with its config and tokenizer
+3. Checks every tensor is aligned to its element size, so the backend can map
+   it without copying
+4. Checks the saved copy gives the same probabilities as the original
+
+Then start the backend with:
+    ROBERTA_MMAP_WEIGHTS=1 ROBERTA_MODEL=Models/roberta_safetensors python app.py
+
+Usage:
+    python export_safetensors.py --source hf
+    python export_safetensors.py --source finetuned
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+# Paths
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BASE_DIR)  # Go up from Model_training to Backend
+MODELS_DIR = os.path.join(BACKEND_DIR, "Models")
+
+HF_MODEL_NAME = "Hello-SimpleAI/chatgpt-detector-roberta"
+FINETUNED_MODEL_PATH = os.path.join(MODELS_DIR, "roberta_finetuned")
+FINETUNED_TOKENIZER_PATH = os.path.join(MODELS_DIR, "roberta_finetuned_tokenizer")
+DEFAULT_OUTPUT = os.path.join(MODELS_DIR, "roberta_safetensors")
+
+ITEM_SIZES = {'F64': 8, 'F32': 4, 'F16': 2, 'BF16': 2, 'I64': 8, 'I32': 4, 'I16': 2, 'I8': 1, 'U8': 1, 'BOOL': 1}
+
+PARITY_SAMPLES = [
+    "This is a test sentence to verify the model works correctly.",
+    "honestly i didnt think the movie was that good but my friends loved it lol",
+]
+
+
+def resolve_source(source):
+    """Model and tokenizer locations for --source"""
+    if source == 'hf':
+        return HF_MODEL_NAME, HF_MODEL_NAME
+    if not os.path.exists(os.path.join(FINETUNED_MODEL_PATH, 'config.json')):
+        print(f"❌ Fine-tuned model not found at {FINETUNED_MODEL_PATH}")
+        print("   Run integrate_finetuned_model.py to check the model files.")
+        sys.exit(1)
+    tokenizer_path = FINETUNED_TOKENIZER_PATH if os.path.exists(FINETUNED_TOKENIZER_PATH) else FINETUNED_MODEL_PATH
+    return FINETUNED_MODEL_PATH, tokenizer_path
+
+
+def check_alignment(weights_path):
+    """Names of tensors whose data does not start on a multiple of their element size"""
+    with open(weights_path, 'rb') as f:
+        header_len = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_len))
+    header.pop('__metadata__', None)
+    return [
+        name for name, info in header.items()
+        if (8 + header_len + info['data_offsets'][0]) % ITEM_SIZES.get(info['dtype'], 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', choices=['hf', 'finetuned'], default='hf')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    model_path, tokenizer_path = resolve_source(args.source)
+
+    print("=" * 60)
+    print("📦 SAVING ROBERTA AS SAFETENSORS")
+    print("=" * 60)
+    print(f"\n📥 Model:     {model_path}")
+    print(f"📥 Tokenizer: {tokenizer_path}")
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    model.save_pretrained(args.output, safe_serialization=True)
+    tokenizer.save_pretrained(args.output)
+
+    weights_path = os.path.join(args.output, "model.safetensors")
+    size = os.path.getsize(weights_path) / (1024 * 1024)
+    print(f"   ✅ Saved: {weights_path} ({size:.1f} MB)")
+
+    misaligned = check_alignment(weights_path)
+    if misaligned:
+        print(f"   ❌ {len(misaligned)} tensor(s) misaligned for zero-copy mapping, e.g. {misaligned[0]}")
+        return False
+    print("   ✅ All tensors aligned for zero-copy mapping")
+
+    print("\n🔬 Parity check (original vs saved)...")
+    saved = AutoModelForSequenceClassification.from_pretrained(args.output).eval()
+    inputs = tokenizer(PARITY_SAMPLES, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        max_diff = (model(**inputs).logits - saved(**inputs).logits).abs().max().item()
+    ok = max_diff == 0.0
+    print(f"   Max |Δ logit| = {max_diff:.2e} ({'✅ identical' if ok else '❌ differs'})")
+    return ok
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
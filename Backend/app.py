@@ -1,17 +1,38 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, g
 from flask_cors import CORS
 import torch
 import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+from transformers.utils import SAFE_WEIGHTS_NAME, cached_file
 import joblib
 import numpy as np
 import pandas as pd
 import os
 import re
-from docx import Document
-from PyPDF2 import PdfReader
+import math
+import random
+import bisect
+import time
+import queue
+import threading
+import gc
+import signal
+import socket
+import tempfile
+import stat
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from extraction import iter_docx_paragraphs, iter_pdf_pages, log_page_timings
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import io
+import json
+import hashlib
+import hmac
+import unicodedata
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from types import SimpleNamespace
 
 app = Flask(__name__)
 CORS(app)
@@ -20,88 +41,1986 @@ CORS(app)
 # GLOBAL VARIABLES
 # ===========================
 
-# RoBERTa Model
-roberta_model = None
-roberta_tokenizer = None
+# RoBERTa Model (the loaded models live in model_registry, see MODEL REGISTRY)
 roberta_model_name = "Hello-SimpleAI/chatgpt-detector-roberta"
 
-# ML Ensemble Models
-ml_ensemble = None
-ml_scaler = None
-ml_tfidf = None
+# HF model name, local model directory, or 'finetuned' for Models/roberta_finetuned
+ROBERTA_MODEL_SOURCE = os.environ.get('ROBERTA_MODEL', roberta_model_name)
 
 # Weights for ensemble combination
 ROBERTA_WEIGHT = 0.70  # RoBERTa gets 70% weight
 ML_WEIGHT = 0.30       # ML models get 30% weight
 
+# Mean RoBERTa chunk probability is scaled by this (capped at 1.0)
+CALIBRATION_FACTOR = 1.35
+
+# Combined probability above this is labelled AI
+DECISION_THRESHOLD = 0.45
+
+# Load models in a background thread at import; predict endpoints answer 503
+# with Retry-After until loading has finished (see GET /ready)
+BACKGROUND_MODEL_LOADING = os.environ.get('BACKGROUND_MODEL_LOADING', '1') == '1'
+# Set by gunicorn.conf.py: importing the app does not load models; each worker
+# calls start_model_loading() itself after it has forked
+DEFER_MODEL_LOADING = os.environ.get('DEFER_MODEL_LOADING', '0') == '1'
+MODEL_RETRY_AFTER_S = int(os.environ.get('MODEL_RETRY_AFTER_S', '5'))
+
+# Number of chunks per RoBERTa forward pass (dynamic padding within each batch)
+ROBERTA_BATCH_SIZE = int(os.environ.get('ROBERTA_BATCH_SIZE', '16'))
+
+# Cross-request micro-batching: chunks from concurrent requests share forward passes
+INFERENCE_SCHEDULER = os.environ.get('INFERENCE_SCHEDULER', '1') == '1'
+SCHEDULER_MAX_BATCH_SIZE = int(os.environ.get('SCHEDULER_MAX_BATCH_SIZE', '32'))
+SCHEDULER_MAX_WAIT_MS = float(os.environ.get('SCHEDULER_MAX_WAIT_MS', '5'))
+
+# Tokenize each document once and slice sentence chunks from the token stream
+SINGLE_PASS_TOKENIZATION = os.environ.get('SINGLE_PASS_TOKENIZATION', '1') == '1'
+
+# 'sentences' scores each sentence plus the first 512 tokens of the whole text;
+# 'sliding_window' scores strided token windows covering the entire document
+ROBERTA_SCORING_MODE = os.environ.get('ROBERTA_SCORING_MODE', 'sentences')
+SLIDING_WINDOW_SIZE = int(os.environ.get('SLIDING_WINDOW_SIZE', '510'))
+SLIDING_WINDOW_STRIDE = int(os.environ.get('SLIDING_WINDOW_STRIDE', '384'))
+
+# Set to 'int8' to serve a dynamically quantized copy of RoBERTa's linear layers
+# (compare against fp32 with Model_training/compare_quantized.py first)
+ROBERTA_QUANTIZE = os.environ.get('ROBERTA_QUANTIZE', '').lower()
+if ROBERTA_QUANTIZE not in ('', 'int8'):
+    raise ValueError(f"ROBERTA_QUANTIZE must be empty or 'int8', got {ROBERTA_QUANTIZE!r}")
+
+# Map RoBERTa's model.safetensors read-only instead of copying it into each
+# process, so workers on one host share the weights through the page cache
+# (export a local copy with Model_training/export_safetensors.py)
+ROBERTA_MMAP_WEIGHTS = os.environ.get('ROBERTA_MMAP_WEIGHTS', '0') == '1'
+
+# 'torch' runs the HF model eagerly; 'onnx' runs the graph exported by
+# Model_training/export_onnx.py with ONNX Runtime on CPU (pip install -r requirements-onnx.txt)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch').lower()
+if INFERENCE_BACKEND not in ('torch', 'onnx'):
+    raise ValueError(f"INFERENCE_BACKEND must be 'torch' or 'onnx', got {INFERENCE_BACKEND!r}")
+ONNX_MODEL_DIR = os.environ.get('ONNX_MODEL_DIR', os.path.join(os.path.dirname(__file__), "Models", "roberta_onnx"))
+ONNX_INTRA_OP_THREADS = int(os.environ.get('ONNX_INTRA_OP_THREADS', '0'))
+
+# Replace the ensemble's exact KNN member with the PCA-reduced approximate
+# index built by Model_training/build_knn_index.py
+ML_KNN_ANN = os.environ.get('ML_KNN_ANN', '0') == '1'
+
+# Run the RoBERTa and ML ensemble branches concurrently; a branch that misses
+# its timeout contributes the neutral 0.5
+PARALLEL_BRANCHES = os.environ.get('PARALLEL_BRANCHES', '1') == '1'
+BRANCH_EXECUTOR_WORKERS = int(os.environ.get('BRANCH_EXECUTOR_WORKERS', '16'))
+ROBERTA_TIMEOUT_S = float(os.environ.get('ROBERTA_TIMEOUT_S', '60'))
+ML_TIMEOUT_S = float(os.environ.get('ML_TIMEOUT_S', '10'))
+
+# Predictions run on INFERENCE_WORKERS threads per process, with at most
+# INFERENCE_QUEUE_SIZE more waiting; beyond that requests get 503 + Retry-After.
+# Every admitted prediction holds one of the worker's WEB_THREADS connection
+# threads (gunicorn.conf.py reads the same variable), so the 503 can only fire
+# while that pool is larger than the executor: by default the queue leaves 4
+# threads free to answer 503s, /ready and /health. A longer queue absorbs
+# bursts but adds latency, and once it reaches WEB_THREADS excess requests
+# wait unseen in gunicorn's accept backlog instead of being refused
+WEB_THREADS = int(os.environ.get('WEB_THREADS', '16'))
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', '2'))
+INFERENCE_QUEUE_SIZE = int(os.environ.get('INFERENCE_QUEUE_SIZE', str(max(0, WEB_THREADS - INFERENCE_WORKERS - 4))))
+BUSY_RETRY_AFTER_S = int(os.environ.get('BUSY_RETRY_AFTER_S', '2'))
+
+# Cascade: run the ML ensemble, then RoBERTa on CASCADE_SAMPLE_SIZE chunks, and
+# only score every chunk when the combined score is within CASCADE_MARGIN of
+# the decision threshold
+CASCADE_MODE = os.environ.get('CASCADE_MODE', '0') == '1'
+CASCADE_SAMPLE_SIZE = int(os.environ.get('CASCADE_SAMPLE_SIZE', '4'))
+CASCADE_MARGIN = float(os.environ.get('CASCADE_MARGIN', '0.15'))
+
+# Early stopping: score chunks in batches of EARLY_STOP_BATCH and stop once a
+# Hoeffding bound (confidence 1 - EARLY_STOP_DELTA) on the running mean
+# excludes the decision threshold
+EARLY_STOP_MODE = os.environ.get('EARLY_STOP_MODE', '0') == '1'
+EARLY_STOP_BATCH = int(os.environ.get('EARLY_STOP_BATCH', '32'))
+EARLY_STOP_MIN_CHUNKS = int(os.environ.get('EARLY_STOP_MIN_CHUNKS', '32'))
+EARLY_STOP_DELTA = float(os.environ.get('EARLY_STOP_DELTA', '0.05'))
+
+# Score PDF sentences while later pages are still being extracted; each
+# pipeline stage holds at most STREAM_QUEUE_SIZE pages / batches in flight
+PDF_STREAMING = os.environ.get('PDF_STREAMING', '1') == '1'
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', '4'))
+
+# PDFs with at least PDF_PARALLEL_MIN_PAGES pages are extracted by
+# PDF_EXTRACT_WORKERS processes (0/1 = always serial); pages slower than
+# PDF_SLOW_PAGE_S are logged
+PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', '16'))
+PDF_SLOW_PAGE_S = float(os.environ.get('PDF_SLOW_PAGE_S', '2.0'))
+
+# Word uploads: body paragraphs only by default (as python-docx's
+# doc.paragraphs); optionally add table cells, headers/footers and foot/endnotes
+DOCX_INCLUDE_TABLES = os.environ.get('DOCX_INCLUDE_TABLES', '0') == '1'
+DOCX_INCLUDE_HEADERS = os.environ.get('DOCX_INCLUDE_HEADERS', '0') == '1'
+DOCX_INCLUDE_FOOTNOTES = os.environ.get('DOCX_INCLUDE_FOOTNOTES', '0') == '1'
+
+# Uploads: bodies over MAX_UPLOAD_MB get 413 (nginx allows 10M); file parts
+# larger than UPLOAD_SPOOL_MAX_KB are written to a temp file instead of RAM;
+# at most UPLOAD_BUDGET_MB of request bodies are admitted at once per process
+MAX_UPLOAD_BYTES = int(float(os.environ.get('MAX_UPLOAD_MB', '10')) * 1024 * 1024)
+UPLOAD_SPOOL_MAX_MEMORY = int(os.environ.get('UPLOAD_SPOOL_MAX_KB', '512')) * 1024
+UPLOAD_BUDGET_BYTES = int(float(os.environ.get('UPLOAD_BUDGET_MB', '64')) * 1024 * 1024)
+UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR') or None
+
+# Content-hash result cache shared by all predict endpoints (0 entries disables it)
+RESULT_CACHE_MAX_ENTRIES = int(os.environ.get('RESULT_CACHE_MAX_ENTRIES', '1024'))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+RESULT_CACHE_TTL_S = float(os.environ.get('RESULT_CACHE_TTL_S', '3600'))
+
+# Hot reload: POST /admin/reload needs this token in X-Admin-Token (unset disables
+# the endpoint); model files are polled every MODEL_WATCH_INTERVAL_S (0 disables).
+# With several worker processes a reload request reaches all of them, each
+# polling for new requests every RELOAD_POLL_INTERVAL_S
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+MODEL_WATCH_INTERVAL_S = float(os.environ.get('MODEL_WATCH_INTERVAL_S', '0'))
+RELOAD_POLL_INTERVAL_S = float(os.environ.get('RELOAD_POLL_INTERVAL_S', '1'))
+
+# Per-sentence RoBERTa probabilities shared across requests, so edited
+# documents only re-score the sentences that changed (0 disables it)
+SENTENCE_CACHE_MAX_ENTRIES = int(os.environ.get('SENTENCE_CACHE_MAX_ENTRIES', '50000'))
+
+# Text extracted from uploads, keyed by the SHA-256 of the file: an in-memory
+# LRU per process backed by an LRU directory shared by every worker on the
+# host (EXTRACTION_CACHE_DISK_MB=0 disables the disk layer). Entries are
+# trusted as-is, so the directory defaults to one next to the app rather than
+# the shared temp dir, and is only used when this user owns it and nobody
+# else can write to it
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.environ.get('EXTRACTION_CACHE_MAX_ENTRIES', '128'))
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get('EXTRACTION_CACHE_MAX_MB', '32')) * 1024 * 1024
+EXTRACTION_CACHE_DISK_BYTES = int(os.environ.get('EXTRACTION_CACHE_DISK_MB', '256')) * 1024 * 1024
+EXTRACTION_CACHE_DIR = os.environ.get('EXTRACTION_CACHE_DIR', os.path.join(os.path.dirname(__file__), ".cache", "extraction"))
+
 # ===========================
 # FEATURE EXTRACTION
 # ===========================
 
-def extract_text_features(text):
-    """Extract linguistic features from text"""
+TEXT_FEATURE_NAMES = [
+    'text_length', 'word_count', 'avg_word_length', 'unique_word_ratio',
+    'upper_case_ratio', 'digit_freq', 'punc_freq', 'exclamation_count',
+    'question_count', 'comma_count', 'period_count', 'avg_sentence_length',
+]
+
+def _text_feature_values(text):
+    """The twelve features of one text, in TEXT_FEATURE_NAMES order.
+
+    Characters are tallied in a single Counter pass; upper-case, digit and
+    punctuation totals are then summed over the distinct characters only.
+    """
     if not isinstance(text, str):
         text = str(text)
     
     words = text.split()
     word_count = len(words)
+    length = len(text)
+    counts = Counter(text)
     
-    features = {
-        'text_length': len(text),
-        'word_count': word_count,
-        'avg_word_length': np.mean([len(w) for w in words]) if words else 0,
-        'unique_word_ratio': len(set(words)) / word_count if word_count > 0 else 0,
-        'upper_case_ratio': sum(1 for c in text if c.isupper()) / len(text) if text else 0,
-        'digit_freq': sum(1 for c in text if c.isdigit()) / len(text) if text else 0,
-        'punc_freq': sum(1 for c in text if c in '.,!?;:') / len(text) if text else 0,
-        'exclamation_count': text.count('!'),
-        'question_count': text.count('?'),
-        'comma_count': text.count(','),
-        'period_count': text.count('.'),
-        'avg_sentence_length': word_count / max(text.count('.') + text.count('!') + text.count('?'), 1),
-    }
+    upper = sum(n for c, n in counts.items() if c.isupper())
+    digits = sum(n for c, n in counts.items() if c.isdigit())
+    punc = sum(counts[c] for c in '.,!?;:')
+    exclamations, questions, periods = counts['!'], counts['?'], counts['.']
+    
+    return (
+        length,
+        word_count,
+        sum(map(len, words)) / word_count if words else 0,
+        len(set(words)) / word_count if word_count > 0 else 0,
+        upper / length if text else 0,
+        digits / length if text else 0,
+        punc / length if text else 0,
+        exclamations,
+        questions,
+        counts[','],
+        periods,
+        word_count / max(periods + exclamations + questions, 1),
+    )
+
+def extract_text_features(text):
+    """Extract linguistic features from text"""
+    return dict(zip(TEXT_FEATURE_NAMES, _text_feature_values(text)))
+
+def extract_text_features_batch(texts):
+    """Extract linguistic features from many texts at once.
+
+    Returns a float array of shape (len(texts), 12) with columns in
+    TEXT_FEATURE_NAMES order, matching extract_text_features() row by row.
+    """
+    features = np.zeros((len(texts), len(TEXT_FEATURE_NAMES)))
+    for row, text in enumerate(texts):
+        features[row] = _text_feature_values(text)
     return features
 
+class FeatureAssembler:
+    """Builds the scaled ML ensemble input row without pandas or a dense TF-IDF copy.
+
+    The scaler is per-feature affine (StandardScaler and friends), so its
+    output for a row is offset + slope * x. Both vectors are measured once at
+    load time; per request the row starts as the scaled all-zero vector and
+    only the handcrafted features and the non-zero TF-IDF entries of the
+    sparse row are written, in the column order of ml_ensemble_features.txt.
+    """
+
+    def __init__(self, scaler, tfidf, feature_names):
+        self.scaler = scaler
+        self.tfidf = tfidf
+        self.feature_names = list(feature_names)
+        positions = {name: i for i, name in enumerate(self.feature_names)}
+        
+        self.numeric_names = [name for name in self.feature_names if not name.startswith('tfidf_')]
+        self.numeric_pos = np.array([positions[name] for name in self.numeric_names], dtype=np.intp)
+        self.tfidf_pos = np.array([positions[f'tfidf_{j}'] for j in range(len(tfidf.vocabulary_))], dtype=np.intp)
+        
+        width = len(self.feature_names)
+        zeros = self._scale(np.zeros((1, width)))[0]
+        ones = self._scale(np.ones((1, width)))[0]
+        self.offset = zeros
+        self.slope = ones - zeros
+        
+        probe = np.random.default_rng(0).uniform(0, 10, size=(1, width))
+        self.affine = np.allclose(self._scale(probe)[0], self.offset + self.slope * probe[0])
+
+    def _scale(self, X):
+        return self.scaler.transform(pd.DataFrame(X, columns=self.feature_names))
+
+    def transform(self, text, features):
+        """Scaled (1, n_features) row for `text` given its extract_text_features() dict"""
+        row = np.zeros(len(self.feature_names))
+        row[self.numeric_pos] = [features[name] for name in self.numeric_names]
+        sparse = self.tfidf.transform([text])
+        cols = self.tfidf_pos[sparse.indices]
+        row[cols] = sparse.data
+        
+        if not self.affine:
+            return self._scale(row.reshape(1, -1))
+        
+        scaled = self.offset.copy()
+        touched = np.concatenate([self.numeric_pos, cols])
+        scaled[touched] += self.slope[touched] * row[touched]
+        return scaled.reshape(1, -1)
+
+def load_feature_names(path, scaler, tfidf):
+    """Column order the scaler was fitted with"""
+    if os.path.exists(path):
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip()]
+    if hasattr(scaler, 'feature_names_in_'):
+        return list(scaler.feature_names_in_)
+    return TEXT_FEATURE_NAMES + [f'tfidf_{i}' for i in range(len(tfidf.vocabulary_))]
+
 # ===========================
-# LOAD MODELS
+# INFERENCE BACKENDS
 # ===========================
 
-print("=" * 60)
-print("LOADING AI DETECTION MODELS")
-print("=" * 60)
+class OnnxSequenceClassifier:
+    """ONNX Runtime stand-in for the HF model: called with tokenizer tensors, returns .logits"""
+
+    def __init__(self, model_dir, intra_op_threads=0):
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, **inputs):
+        feed = {name: tensor.cpu().numpy().astype(np.int64) for name, tensor in inputs.items() if name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+SAFETENSORS_DTYPES = {
+    'F64': torch.float64, 'F32': torch.float32, 'F16': torch.float16, 'BF16': torch.bfloat16,
+    'I64': torch.int64, 'I32': torch.int32, 'I16': torch.int16, 'I8': torch.int8,
+    'U8': torch.uint8, 'BOOL': torch.bool,
+}
+
+def mmap_safetensors(path):
+    """State dict whose tensors are views into a private read-only mapping of a safetensors file.
+
+    Nothing is copied: pages are faulted in from the OS page cache, so every
+    process that maps the same file shares one physical copy of the weights.
+    """
+    with open(path, 'rb') as f:
+        header_len = int.from_bytes(f.read(8), 'little')
+        header = json.loads(f.read(header_len))
+    header.pop('__metadata__', None)
+    data_start = 8 + header_len
+    
+    # MAP_PRIVATE: a stray in-place write copies the page instead of touching the file
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    state = {}
+    for name, info in header.items():
+        dtype = SAFETENSORS_DTYPES[info['dtype']]
+        offset = data_start + info['data_offsets'][0]
+        itemsize = torch.empty((), dtype=dtype).element_size()
+        if offset % itemsize:
+            raise ValueError(f"{name} is not {itemsize}-byte aligned in {path}")
+        state[name] = torch.empty(0, dtype=dtype).set_(storage, offset // itemsize, info['shape'])
+    return state
+
+@contextmanager
+def parameters_on_meta():
+    """Create module parameters on the meta device: shapes only, no memory, no initialisation.
+
+    Buffers are still created for real, so the non-persistent ones a
+    checkpoint does not contain (position ids and the like) keep their values.
+    """
+    register_parameter = torch.nn.Module.register_parameter
+    
+    def register_on_meta(module, name, param):
+        register_parameter(module, name, param)
+        if param is not None:
+            param = module._parameters[name]
+            module._parameters[name] = type(param)(param.to('meta'), requires_grad=param.requires_grad)
+    
+    torch.nn.Module.register_parameter = register_on_meta
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+def load_mmap_model(model_path):
+    """Build the classifier from its config and point its parameters at the mapped weights.
+
+    The skeleton's parameters live on the meta device until the mapped
+    tensors are assigned, so no private fp32 copy is ever allocated.
+    """
+    weights_path = cached_file(model_path, SAFE_WEIGHTS_NAME)
+    config = AutoConfig.from_pretrained(model_path)
+    with parameters_on_meta():
+        model = AutoModelForSequenceClassification.from_config(config)
+    
+    state = mmap_safetensors(weights_path)
+    model.load_state_dict(state, strict=False, assign=True)
+    model.tie_weights()
+    missing = [name for name, param in model.named_parameters() if param.is_meta]
+    if missing:
+        raise ValueError(f"{weights_path} is missing {len(missing)} parameter(s), e.g. {missing[0]}")
+    return model.eval()
 
-# Load RoBERTa
-print(f"\n[*] Loading RoBERTa: {roberta_model_name}...")
-try:
-    roberta_tokenizer = AutoTokenizer.from_pretrained(roberta_model_name)
-    roberta_model = AutoModelForSequenceClassification.from_pretrained(roberta_model_name)
-    print(f"   [OK] RoBERTa loaded successfully")
-except Exception as e:
-    print(f"   [FAIL] Failed to load RoBERTa: {e}")
+# ===========================
+# MODEL REGISTRY
+# ===========================
 
-# Load ML Ensemble
 models_dir = os.path.join(os.path.dirname(__file__), "Models")
 ensemble_path = os.path.join(models_dir, "ml_ensemble_model.joblib")
 scaler_path = os.path.join(models_dir, "ml_ensemble_scaler.joblib")
 tfidf_path = os.path.join(models_dir, "ml_ensemble_tfidf.joblib")
+features_path = os.path.join(models_dir, "ml_ensemble_features.txt")
+knn_index_path = os.path.join(models_dir, "ml_ensemble_knn_ann.joblib")
+finetuned_model_path = os.path.join(models_dir, "roberta_finetuned")
+finetuned_tokenizer_path = os.path.join(models_dir, "roberta_finetuned_tokenizer")
+
+WARMUP_TEXT = ("This sentence is only used to warm up a freshly loaded model before it serves traffic. "
+               "It is long enough to be scored as a sentence chunk on its own.")
+
+def _artifact_signature(path):
+    try:
+        stat = os.stat(path)
+        return f"{stat.st_size}-{int(stat.st_mtime)}"
+    except OSError:
+        return 'missing'
+
+def _dir_signature(path):
+    if not os.path.isdir(path):
+        return None
+    return sorted((name, _artifact_signature(os.path.join(path, name))) for name in os.listdir(path))
+
+def resolve_roberta_source(source):
+    """(model location, tokenizer location) for an HF name, a local directory or 'finetuned'"""
+    if source == 'finetuned':
+        tokenizer = finetuned_tokenizer_path if os.path.isdir(finetuned_tokenizer_path) else finetuned_model_path
+        return finetuned_model_path, tokenizer
+    return source, source
+
+def _short_hash(parts):
+    return hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:12]
+
+class ModelBundle:
+    """One loaded version of RoBERTa and the ML ensemble.
+
+    Requests take the active bundle when they start and use it throughout,
+    so a reload never mixes versions within one request.
+    """
+
+    def __init__(self, roberta_source):
+        self.roberta_source = roberta_source
+        self.tokenizer = None
+        self.model = None
+        self.ensemble = None
+        self.scaler = None
+        self.tfidf = None
+        self.assembler = None
+        # Per-model load state for /ready: pending -> loading -> ready | failed | missing
+        self.status = {
+            name: {'state': 'pending', 'load_time_s': None, 'error': None}
+            for name in ('roberta', 'ml_ensemble')
+        }
+        self.watch_signature = None
+        self.roberta_version = None
+        self.ml_version = None
+        self.version = None
+        self.in_flight = 0
+        self.retired = False
 
-print(f"\n[*] Loading ML Ensemble (Random Forest + KNN)...")
-try:
-    if os.path.exists(ensemble_path) and os.path.exists(scaler_path) and os.path.exists(tfidf_path):
-        ml_ensemble = joblib.load(ensemble_path)
-        ml_scaler = joblib.load(scaler_path)
-        ml_tfidf = joblib.load(tfidf_path)
-        print(f"   [OK] ML Ensemble loaded successfully")
+    def _set_status(self, name, state, started=None, error=None):
+        self.status[name]['state'] = state
+        if started is not None:
+            self.status[name]['load_time_s'] = round(time.monotonic() - started, 3)
+        if error is not None:
+            self.status[name]['error'] = str(error)
+
+    def load(self):
+        self.watch_signature = model_files_signature(self.roberta_source)
+        load_roberta(self)
+        load_ml_ensemble(self)
+        self.roberta_version = _short_hash([
+            self.watch_signature['roberta'], INFERENCE_BACKEND, ROBERTA_QUANTIZE,
+        ]) if self.model is not None else None
+        self.ml_version = _short_hash(self.watch_signature['ml_ensemble']) if self.ensemble is not None else None
+        # Identifies the weights and scoring settings behind a result, for cache keys
+        self.version = _short_hash([
+            self.roberta_version, self.ml_version,
+            ROBERTA_SCORING_MODE, SLIDING_WINDOW_SIZE, SLIDING_WINDOW_STRIDE,
+            SINGLE_PASS_TOKENIZATION, ROBERTA_WEIGHT, ML_WEIGHT, DECISION_THRESHOLD,
+            [CASCADE_SAMPLE_SIZE, CASCADE_MARGIN] if CASCADE_MODE else None,
+            [EARLY_STOP_BATCH, EARLY_STOP_MIN_CHUNKS, EARLY_STOP_DELTA] if EARLY_STOP_MODE else None,
+        ])
+
+    def release(self):
+        """Drop the weights so they can be freed once nothing references them"""
+        self.tokenizer = self.model = None
+        self.ensemble = self.scaler = self.tfidf = self.assembler = None
+
+    def versions(self):
+        return {'bundle': self.version, 'roberta': self.roberta_version, 'ml_ensemble': self.ml_version}
+
+def model_files_signature(roberta_source):
+    """Size/mtime of every file a bundle is loaded from, for change detection"""
+    if INFERENCE_BACKEND == 'onnx':
+        roberta = [_artifact_signature(os.path.join(ONNX_MODEL_DIR, "model.onnx"))]
     else:
-        print(f"   [WARN] ML Ensemble not found. Run train_ensemble_all_data.py first.")
+        model_path, _ = resolve_roberta_source(roberta_source)
+        roberta = [roberta_source, _dir_signature(model_path)]
+    ml = [_artifact_signature(path) for path in (ensemble_path, scaler_path, tfidf_path)]
+    if ML_KNN_ANN:
+        ml.append(_artifact_signature(knn_index_path))
+    return {'roberta': roberta, 'ml_ensemble': ml}
+
+def load_roberta(bundle):
+    model_path, tokenizer_path = resolve_roberta_source(bundle.roberta_source)
+    print(f"\n[*] Loading RoBERTa: {model_path}...")
+    started = time.monotonic()
+    bundle._set_status('roberta', 'loading')
+    try:
+        if INFERENCE_BACKEND == 'onnx':
+            # export_onnx.py saves the matching tokenizer next to the graph
+            tokenizer = AutoTokenizer.from_pretrained(ONNX_MODEL_DIR)
+            model = OnnxSequenceClassifier(ONNX_MODEL_DIR, ONNX_INTRA_OP_THREADS)
+            print(f"   [OK] ONNX Runtime backend: {ONNX_MODEL_DIR}")
+        else:
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+            model = None
+            if ROBERTA_MMAP_WEIGHTS:
+                try:
+                    model = load_mmap_model(model_path)
+                    print(f"   [OK] Weights memory-mapped from {SAFE_WEIGHTS_NAME}")
+                    if ROBERTA_QUANTIZE == 'int8':
+                        print(f"   [WARN] int8 quantization copies the linear layers, so they are not shared")
+                except Exception as e:
+                    print(f"   [WARN] Memory-mapped loading unavailable, loading a private copy: {e}")
+            if model is None:
+                model = AutoModelForSequenceClassification.from_pretrained(model_path)
+        if ROBERTA_QUANTIZE == 'int8' and INFERENCE_BACKEND == 'torch':
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            print(f"   [OK] Linear layers quantized to dynamic int8")
+        bundle.tokenizer, bundle.model = tokenizer, model
+        bundle._set_status('roberta', 'ready', started)
+        print(f"   [OK] RoBERTa loaded successfully")
+    except Exception as e:
+        bundle._set_status('roberta', 'failed', started, e)
+        print(f"   [FAIL] Failed to load RoBERTa: {e}")
+
+def load_ml_ensemble(bundle):
+    print(f"\n[*] Loading ML Ensemble (Random Forest + KNN)...")
+    started = time.monotonic()
+    bundle._set_status('ml_ensemble', 'loading')
+    try:
+        if os.path.exists(ensemble_path) and os.path.exists(scaler_path) and os.path.exists(tfidf_path):
+            ensemble = joblib.load(ensemble_path)
+            scaler = joblib.load(scaler_path)
+            tfidf = joblib.load(tfidf_path)
+            print(f"   [OK] ML Ensemble loaded successfully")
+            if ML_KNN_ANN:
+                try:
+                    from knn_index import install_knn_index
+                    if os.path.exists(knn_index_path):
+                        swapped = install_knn_index(ensemble, joblib.load(knn_index_path))
+                        print(f"   [OK] Approximate KNN index installed ({swapped} member(s))")
+                    else:
+                        print(f"   [WARN] {knn_index_path} not found, using exact KNN. Run Model_training/build_knn_index.py.")
+                except Exception as e:
+                    print(f"   [WARN] Approximate KNN index unavailable, using exact KNN: {e}")
+            assembler = None
+            try:
+                assembler = FeatureAssembler(scaler, tfidf, load_feature_names(features_path, scaler, tfidf))
+                print(f"   [OK] Sparse feature assembler ready ({'affine' if assembler.affine else 'dense'} scaling)")
+            except Exception as e:
+                print(f"   [WARN] Sparse feature assembler unavailable, using pandas path: {e}")
+            bundle.ensemble, bundle.scaler, bundle.tfidf, bundle.assembler = ensemble, scaler, tfidf, assembler
+            bundle._set_status('ml_ensemble', 'ready', started)
+        else:
+            bundle._set_status('ml_ensemble', 'missing', started)
+            print(f"   [WARN] ML Ensemble not found. Run train_ensemble_all_data.py first.")
+            print(f"   Will use RoBERTa only.")
+    except Exception as e:
+        bundle._set_status('ml_ensemble', 'failed', started, e)
+        print(f"   [WARN] Failed to load ML Ensemble: {e}")
         print(f"   Will use RoBERTa only.")
-except Exception as e:
-    print(f"   [WARN] Failed to load ML Ensemble: {e}")
-    print(f"   Will use RoBERTa only.")
 
-print("\n" + "=" * 60)
-print(f"MODELS LOADED - RoBERTa Weight: {ROBERTA_WEIGHT:.0%}, ML Weight: {ML_WEIGHT:.0%}")
-print("=" * 60 + "\n")
+class ModelRegistry:
+    """Holds the active ModelBundle and swaps in reloaded ones atomically.
+
+    A reload builds and warms up a complete new bundle in the background
+    while the old one keeps serving. The swap is a single reference
+    assignment; requests already running finish on the bundle they
+    acquired, and a retired bundle's weights are released once its last
+    in-flight request completes.
+    """
+
+    def __init__(self, roberta_source):
+        self.roberta_source = roberta_source
+        self._active = None
+        self._loading = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.ready = threading.Event()
+        self.reloads = {'state': 'idle', 'count': 0, 'last_error': None, 'last_swap_at': None}
+        # Files of the last failed reload; the watcher skips them until they change again
+        self.failed_signature = None
+
+    def current(self):
+        return self._active
+
+    @contextmanager
+    def acquire(self):
+        """Pin the active bundle for the duration of a request"""
+        with self._lock:
+            bundle = self._active
+            bundle.in_flight += 1
+        try:
+            yield bundle
+        finally:
+            with self._lock:
+                bundle.in_flight -= 1
+                release = bundle.retired and bundle.in_flight == 0
+            if release:
+                self._release(bundle)
+
+    def status(self):
+        bundle = self._active or self._loading
+        return bundle.status if bundle else {}
+
+    def load_initial(self):
+        bundle = ModelBundle(self.roberta_source)
+        self._loading = bundle
+        bundle.load()
+        with self._lock:
+            self._active = bundle
+            self._loading = None
+        self.ready.set()
+
+    def reload(self, roberta_source=None, wait=False):
+        """Load, warm up and swap in a new bundle; the old one keeps serving if this fails.
+
+        The swap is refused when the new bundle lacks RoBERTa or any model
+        the active bundle has loaded. Returns False without reloading when
+        another reload is running, unless `wait` is set. Worker processes
+        sharing a reload_fanout take turns, so only one of them holds two
+        versions of the weights at a time.
+        """
+        if not self._reload_lock.acquire(blocking=wait):
+            return False
+        bundle = None
+        try:
+            if reload_fanout:
+                self.reloads['state'] = 'queued'
+            with reload_fanout.exclusive() if reload_fanout else nullcontext():
+                self.reloads['state'] = 'loading'
+                source = roberta_source or self._active.roberta_source
+                print(f"\n[Registry] Reloading models (RoBERTa: {source})...")
+                bundle = ModelBundle(source)
+                bundle.load()
+                lost = [
+                    name for name, status in bundle.status.items()
+                    if status['state'] != 'ready' and (name == 'roberta' or self._active.status[name]['state'] == 'ready')
+                ]
+                if lost:
+                    raise RuntimeError('; '.join(
+                        f"{name} {bundle.status[name]['state']}: {bundle.status[name]['error']}" for name in lost
+                    ))
+                
+                self.reloads['state'] = 'warming_up'
+                warm_up(bundle)
+                
+                with self._lock:
+                    old, self._active = self._active, bundle
+                    old.retired = True
+                    release = old.in_flight == 0
+                self.roberta_source = source
+                self.failed_signature = None
+                self.reloads.update(state='idle', count=self.reloads['count'] + 1,
+                                    last_error=None, last_swap_at=time.time())
+                print(f"[Registry] Active version {old.version} -> {bundle.version}")
+                if release:
+                    self._release(old)
+                return True
+        except Exception as e:
+            self.failed_signature = bundle.watch_signature if bundle else None
+            self.reloads.update(state='idle', last_error=str(e))
+            print(f"[Registry] Reload failed, keeping version {self._active.version}: {e}")
+            return False
+        finally:
+            self._reload_lock.release()
+
+    def start_reload(self, roberta_source=None):
+        """Reload in a background thread; False if a reload is already running"""
+        if self._reload_lock.locked():
+            return False
+        threading.Thread(target=self.reload, args=(roberta_source,), name='model-reload', daemon=True).start()
+        return True
+
+    def _release(self, bundle):
+        print(f"[Registry] Releasing retired version {bundle.version}")
+        bundle.release()
+        gc.collect()
+
+model_registry = ModelRegistry(ROBERTA_MODEL_SOURCE)
+
+class ReloadFanout:
+    """Carries reload requests to every worker process forked after it is made.
+
+    The workers share one unlinked file holding the latest request, its
+    generation and RoBERTa source; each worker polls it and reloads when
+    the generation moves. A lock on the file makes the workers reload one
+    at a time, and the kernel drops it if its holder dies mid-reload.
+    """
+
+    # Byte offsets of the file's two advisory locks
+    REQUEST_LOCK = 0
+    RELOAD_LOCK = 1
+
+    def __init__(self):
+        import fcntl
+        
+        self._fcntl = fcntl
+        self._file = tempfile.TemporaryFile()
+        self._fd = self._file.fileno()
+        # fcntl locks belong to the process, so its threads need their own
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self, offset):
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, 1, offset)
+        try:
+            yield
+        finally:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, 1, offset)
+
+    def _read(self):
+        data = os.pread(self._fd, 64 * 1024, 0)
+        if not data:
+            return 0, None
+        request = json.loads(data)
+        return request['generation'], request['roberta_source']
+
+    def publish(self, roberta_source):
+        """Ask every worker to reload from roberta_source; returns the request's generation"""
+        with self._thread_lock, self._locked(self.REQUEST_LOCK):
+            generation = self._read()[0] + 1
+            os.ftruncate(self._fd, 0)
+            os.pwrite(self._fd, json.dumps({'generation': generation, 'roberta_source': roberta_source}).encode('utf-8'), 0)
+        return generation
+
+    def latest(self):
+        """(generation, roberta_source) of the last request, (0, None) before the first"""
+        with self._thread_lock, self._locked(self.REQUEST_LOCK):
+            return self._read()
+
+    def exclusive(self):
+        """Held for the whole of a reload, so the workers take turns"""
+        return self._locked(self.RELOAD_LOCK)
+
+# Set in the parent before it forks workers, by share_reloads_with_workers()
+reload_fanout = None
+
+def warm_up(bundle):
+    """Run one request's worth of work through a bundle before it takes traffic"""
+    roberta_chunk_probs(bundle, prepare_chunks(bundle, WARMUP_TEXT)[0])
+    ml_branch(bundle, WARMUP_TEXT, log_tag=' Warm-up')
+
+def load_models():
+    print("=" * 60)
+    print("LOADING AI DETECTION MODELS")
+    print("=" * 60)
+    
+    model_registry.load_initial()
+    
+    print("\n" + "=" * 60)
+    print(f"MODELS LOADED - RoBERTa Weight: {ROBERTA_WEIGHT:.0%}, ML Weight: {ML_WEIGHT:.0%}")
+    print("=" * 60 + "\n")
+
+def start_model_loading():
+    """Load models in a background thread so the server can bind its port immediately"""
+    if BACKGROUND_MODEL_LOADING:
+        threading.Thread(target=load_models, name='model-loader', daemon=True).start()
+    else:
+        load_models()
+
+def models_loading_response():
+    """503 + Retry-After while models are still loading"""
+    response = jsonify({'error': 'Models are still loading, retry shortly', 'models': model_registry.status()})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(MODEL_RETRY_AFTER_S)
+    return response
+
+def _watch_model_files():
+    while True:
+        time.sleep(MODEL_WATCH_INTERVAL_S)
+        bundle = model_registry.current()
+        if bundle is None:
+            continue
+        signature = model_files_signature(bundle.roberta_source)
+        if signature != bundle.watch_signature and signature != model_registry.failed_signature:
+            print("[Registry] Model files changed on disk")
+            model_registry.start_reload()
+
+def _follow_reload_requests(seen):
+    model_registry.ready.wait()
+    while True:
+        time.sleep(RELOAD_POLL_INTERVAL_S)
+        generation, source = reload_fanout.latest()
+        if generation != seen:
+            seen = generation
+            model_registry.reload(source, wait=True)
+
+def share_reloads_with_workers():
+    """Make /admin/reload reach every worker forked after this call"""
+    global reload_fanout
+    reload_fanout = ReloadFanout()
+
+def start_model_watcher():
+    """Poll model files and hot-reload on change (started per serving process)"""
+    if MODEL_WATCH_INTERVAL_S > 0:
+        threading.Thread(target=_watch_model_files, name='model-watcher', daemon=True).start()
+
+# ===========================
+# ROBERTA INFERENCE
+# ===========================
+
+def sentence_spans(text):
+    """Character (start, end) offsets of the sentences that are long enough to score"""
+    spans = []
+    start = 0
+    for match in list(re.finditer(r'(?<=[.!?])\s+', text)) + [None]:
+        end = match.start() if match else len(text)
+        piece = text[start:end]
+        stripped = piece.strip()
+        if len(stripped) > 50:
+            lead = len(piece) - len(piece.lstrip())
+            spans.append((start + lead, start + lead + len(stripped)))
+        if match:
+            start = match.end()
+    return spans
+
+def split_into_chunks(text):
+    """Split text into sentence chunks, plus the whole text when there are several"""
+    sentences = [text[a:b] for a, b in sentence_spans(text)]
+    
+    if not sentences:
+        sentences = [text]
+        
+    if len(sentences) > 1:
+        return sentences + [text]
+    return sentences
+
+def encode_chunks(models, chunks):
+    """Tokenize each chunk separately, truncated to the model's 512 tokens"""
+    return models.tokenizer(chunks, truncation=True, max_length=512)['input_ids']
+
+def prepare_chunks(models, text):
+    """Tokenize the document once and cut the sentence chunks out of its token stream.
+
+    Returns the input ids of every chunk and the character span of each one;
+    the whole-text chunk (first 512 tokens) has span None. Falls back to
+    tokenizing chunk by chunk when the tokenizer has no offset mapping.
+    """
+    spans = sentence_spans(text)
+    chunk_spans = spans + [None] if len(spans) > 1 else [spans[0] if spans else None]
+    
+    if not SINGLE_PASS_TOKENIZATION or not models.tokenizer.is_fast:
+        return encode_chunks(models, split_into_chunks(text)), chunk_spans
+    
+    encoding = models.tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+    ids = encoding['input_ids']
+    token_starts = [start for start, _ in encoding['offset_mapping']]
+    max_tokens = 512 - models.tokenizer.num_special_tokens_to_add()
+    
+    encoded = []
+    for span in chunk_spans:
+        if span is None:
+            window = ids
+        else:
+            window = ids[bisect.bisect_left(token_starts, span[0]):bisect.bisect_left(token_starts, span[1])]
+        encoded.append(models.tokenizer.build_inputs_with_special_tokens(window[:max_tokens]))
+    return encoded, chunk_spans
+
+def prepare_windows(models, text):
+    """Cover the whole document with the fewest strided token windows.
+
+    Windows are SLIDING_WINDOW_SIZE tokens apart by SLIDING_WINDOW_STRIDE, with
+    the last one pulled back to end exactly on the final token. Returns the
+    input ids of each window and its (start, end) token range.
+    """
+    ids = models.tokenizer(text, add_special_tokens=False)['input_ids']
+    size = min(SLIDING_WINDOW_SIZE, 512 - models.tokenizer.num_special_tokens_to_add())
+    stride = max(1, min(SLIDING_WINDOW_STRIDE, size))
+    
+    if len(ids) <= size:
+        starts = [0]
+    else:
+        count = -(-(len(ids) - size) // stride) + 1
+        starts = [min(i * stride, len(ids) - size) for i in range(count)]
+    
+    ranges = [(start, min(start + size, len(ids))) for start in starts]
+    encoded = [models.tokenizer.build_inputs_with_special_tokens(ids[a:b]) for a, b in ranges]
+    return encoded, ranges
+
+def combine_windows(ranges, window_probs):
+    """Average over tokens of the mean probability of the windows covering each token"""
+    total = ranges[-1][1]
+    if total == 0:
+        return sum(window_probs) / len(window_probs)
+    
+    coverage = [0] * (total + 1)
+    prob_sum = [0.0] * (total + 1)
+    for (a, b), p in zip(ranges, window_probs):
+        coverage[a] += 1
+        coverage[b] -= 1
+        prob_sum[a] += p
+        prob_sum[b] -= p
+    
+    score = 0.0
+    covered, running = 0, 0.0
+    for i in range(total):
+        covered += coverage[i]
+        running += prob_sum[i]
+        score += running / covered
+    return score / total
+
+class DocumentScore:
+    """The RoBERTa chunks of one document and the probabilities scored so far.
+
+    Chunks can be scored a subset at a time, so callers such as the cascade
+    can stop before every chunk has been through the model. Sentence chunks
+    are taken from `prescored` (sentence cache key -> (prob, reused), filled
+    while a PDF was streamed) or the shared sentence cache before being
+    scored. Setting `cancel` stops scoring at the next batch boundary.
+    """
+
+    def __init__(self, models, text, cancel=None, prescored=None):
+        self.models = models
+        self.text = text
+        self.cancel = cancel or threading.Event()
+        self.prescored = prescored or {}
+        self.ranges = None
+        if ROBERTA_SCORING_MODE == 'sliding_window':
+            self.encoded, self.ranges = prepare_windows(models, text)
+            self.spans = [None] * len(self.encoded)
+        else:
+            self.encoded, self.spans = prepare_chunks(models, text)
+        self.probs = [None] * len(self.encoded)
+        self.sentences_reused = 0
+        self.sentences_computed = 0
+        self.stopped_early = False
+
+    def score(self, indices=None):
+        """Score the given chunk indices (all chunks by default) that are not scored yet"""
+        if indices is None:
+            indices = range(len(self.encoded))
+        indices = [i for i in indices if self.probs[i] is None]
+        
+        # Reuse probabilities streamed for this document or scored by earlier requests
+        keys = {}
+        for i in indices:
+            span = self.spans[i]
+            if span is not None:
+                keys[i] = sentence_cache_key(self.models, self.encoded[i])
+                if keys[i] in self.prescored:
+                    self.probs[i], reused = self.prescored[keys[i]]
+                    if reused:
+                        self.sentences_reused += 1
+                    else:
+                        self.sentences_computed += 1
+                    continue
+                cached = sentence_cache.get(keys[i])
+                if cached is not None:
+                    self.probs[i] = cached
+                    self.sentences_reused += 1
+        
+        # Shortest first, one batch at a time, so a cancelled request stops
+        # queueing work while each batch still pads only to similar lengths
+        missing = sorted((i for i in indices if self.probs[i] is None), key=lambda i: len(self.encoded[i]))
+        batch_size = SCHEDULER_MAX_BATCH_SIZE if INFERENCE_SCHEDULER else ROBERTA_BATCH_SIZE
+        for start in range(0, len(missing), batch_size):
+            if self.cancel.is_set():
+                return
+            batch = missing[start:start + batch_size]
+            for i, p in zip(batch, roberta_chunk_probs(self.models, [self.encoded[i] for i in batch])):
+                self.probs[i] = p
+                if i in keys:
+                    sentence_cache.put(keys[i], p)
+                    self.sentences_computed += 1
+
+    @property
+    def scored(self):
+        return sum(1 for p in self.probs if p is not None)
+
+    @property
+    def complete(self):
+        return self.scored == len(self.probs)
+
+    def prob(self):
+        """Document-level probability from the chunks scored so far"""
+        if self.ranges is not None and self.complete:
+            return combine_windows(self.ranges, self.probs)
+        scored = [p for p in self.probs if p is not None]
+        return sum(scored) / len(scored)
+
+def sentence_scores(spans, chunk_probs):
+    """Per-sentence character offsets and AI probability for highlighting"""
+    return [
+        {'start': span[0], 'end': span[1], 'ai_probability': float(p)}
+        for span, p in zip(spans, chunk_probs) if span is not None and p is not None
+    ]
+
+def score_chunks(models, encoded, batch_size=None):
+    """Return the RoBERTa AI probability of every encoded chunk, scored in padded mini-batches.
+
+    Chunks are sorted by token length before batching so each batch only pads
+    to its own longest member; probabilities come back in the original order.
+    """
+    batch_size = batch_size or ROBERTA_BATCH_SIZE
+    lengths = [len(ids) for ids in encoded]
+    order = sorted(range(len(encoded)), key=lambda i: lengths[i])
+    chunk_probs = [0.0] * len(encoded)
+    
+    for start in range(0, len(order), batch_size):
+        batch_idx = order[start:start + batch_size]
+        inputs = models.tokenizer.pad({'input_ids': [encoded[i] for i in batch_idx]}, return_tensors="pt")
+        
+        with torch.no_grad():
+            outputs = models.model(**inputs)
+            probs = F.softmax(outputs.logits, dim=-1)
+        
+        for i, p in zip(batch_idx, probs[:, 1].tolist()):
+            chunk_probs[i] = p
+    
+    record_padding(lengths, order, batch_size)
+    return chunk_probs
+
+# Padding accounting, served by /stats
+inference_stats = {
+    'batches': 0,
+    'chunks': 0,
+    'real_tokens': 0,
+    'padded_tokens': 0,
+    'unbucketed_padded_tokens': 0,
+}
+inference_stats_lock = threading.Lock()
+
+def _padding_for(lengths, order, batch_size):
+    padded = 0
+    for start in range(0, len(order), batch_size):
+        batch = [lengths[i] for i in order[start:start + batch_size]]
+        padded += max(batch) * len(batch) - sum(batch)
+    return padded
+
+def record_padding(lengths, order, batch_size):
+    """Count real vs padding tokens, and the padding arrival-order batching would have cost"""
+    padded = _padding_for(lengths, order, batch_size)
+    unbucketed = _padding_for(lengths, range(len(lengths)), batch_size)
+    with inference_stats_lock:
+        inference_stats['batches'] += -(-len(lengths) // batch_size)
+        inference_stats['chunks'] += len(lengths)
+        inference_stats['real_tokens'] += sum(lengths)
+        inference_stats['padded_tokens'] += padded
+        inference_stats['unbucketed_padded_tokens'] += unbucketed
+
+class InferenceScheduler:
+    """Gathers chunks from concurrent requests into shared RoBERTa batches.
+
+    A single worker thread owns the model. It takes the first queued chunk,
+    keeps collecting until the batch is full or max_wait_ms has passed, scores
+    the batch and hands each probability back to the request that queued it.
+    Chunks carry the model bundle they were queued for, so a batch spanning a
+    hot reload is scored per bundle.
+    """
+
+    def __init__(self, score_fn, max_batch_size, max_wait_ms):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so each process starts its own worker
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+            self._thread.start()
+
+    def submit(self, models, chunks):
+        """Queue encoded chunks for scoring and block until all their probabilities are back"""
+        self._ensure_started()
+        futures = []
+        for chunk in chunks:
+            future = Future()
+            self._queue.put((models, chunk, future))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for item in self._collect():
+                groups.setdefault(id(item[0]), []).append(item)
+            for group in groups.values():
+                try:
+                    probs = self.score_fn(group[0][0], [chunk for _, chunk, _ in group])
+                except Exception as e:
+                    for _, _, future in group:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), prob in zip(group, probs):
+                    future.set_result(prob)
+
+inference_scheduler = InferenceScheduler(
+    lambda models, encoded: score_chunks(models, encoded, batch_size=SCHEDULER_MAX_BATCH_SIZE),
+    max_batch_size=SCHEDULER_MAX_BATCH_SIZE,
+    max_wait_ms=SCHEDULER_MAX_WAIT_MS,
+)
+
+def roberta_chunk_probs(models, encoded):
+    """Score encoded chunks through the shared scheduler, or directly when it is disabled"""
+    if INFERENCE_SCHEDULER:
+        return inference_scheduler.submit(models, encoded)
+    return score_chunks(models, encoded)
+
+# ===========================
+# RESULT CACHE
+# ===========================
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and, optionally, total bytes and TTL"""
+
+    def __init__(self, max_entries, max_bytes=0, ttl_seconds=0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, size, stored_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds and time.monotonic() - entry[2] > self.ttl_seconds:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size=0):
+        if self.max_entries <= 0 or (self.max_bytes and size > self.max_bytes):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+result_cache = LRUCache(RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_S)
+sentence_cache = LRUCache(SENTENCE_CACHE_MAX_ENTRIES)
+
+def normalize_text(text):
+    """Canonical form of submitted text: NFC Unicode and LF line endings"""
+    return unicodedata.normalize('NFC', text.replace('\r\n', '\n').replace('\r', '\n'))
+
+def result_cache_key(models, text):
+    return hashlib.sha256(f"{models.version}\0{text}".encode('utf-8')).hexdigest()
+
+def sentence_cache_key(models, input_ids):
+    """Key of one encoded chunk's probability.
+
+    Built from the token ids rather than the sentence text, since the ids of
+    a sentence cut from a whole-document encoding depend on the character
+    before it, and from the RoBERTa version only, so reloading the ML
+    ensemble keeps the cached sentences.
+    """
+    ids = ','.join(map(str, input_ids))
+    return hashlib.sha1(f"{models.roberta_version}\0{ids}".encode('utf-8')).hexdigest()
+
+# ===========================
+# PREDICTION PIPELINE
+# ===========================
+
+def calibrate_roberta(avg_ai_prob):
+    """Apply calibration to the raw mean RoBERTa probability"""
+    return min(avg_ai_prob * CALIBRATION_FACTOR, 1.0)
+
+def combine_probs(models, roberta_ai_prob, ml_ai_prob):
+    """Weighted average of the two branches (RoBERTa alone without the ML ensemble)"""
+    if models.ensemble:
+        return (ROBERTA_WEIGHT * roberta_ai_prob) + (ML_WEIGHT * ml_ai_prob)
+    return roberta_ai_prob
+
+def raw_decision_threshold(models, ml_ai_prob):
+    """Raw mean RoBERTa probability at which the combined score crosses DECISION_THRESHOLD"""
+    target = DECISION_THRESHOLD
+    if models.ensemble:
+        target = (DECISION_THRESHOLD - ML_WEIGHT * ml_ai_prob) / ROBERTA_WEIGHT
+    if target >= 1.0:
+        return math.inf   # calibration is capped at 1.0, so RoBERTa cannot tip it to AI
+    return target / CALIBRATION_FACTOR
+
+def score_early_stop(doc, ml_prob):
+    """Score chunks in batches until a Hoeffding bound on the mean excludes the threshold.
+
+    Chunks are visited in a fixed pseudo-random order so the running mean is
+    an unbiased sample of the whole document. Chunk probabilities lie in
+    [0, 1], so after n chunks the mean is within sqrt(ln(2/delta) / 2n) of
+    the full-document mean with probability 1 - delta.
+    
+    `ml_prob()` places the threshold; it is only called at the first bound
+    check, so the batches before EARLY_STOP_MIN_CHUNKS overlap with a
+    concurrently running ML branch.
+    """
+    total = len(doc.probs)
+    order = list(range(total))
+    random.Random(total).shuffle(order)
+    threshold = None
+    
+    for start in range(0, total, EARLY_STOP_BATCH):
+        if doc.cancel.is_set():
+            return
+        doc.score(order[start:start + EARLY_STOP_BATCH])
+        n = doc.scored
+        if n < EARLY_STOP_MIN_CHUNKS or n == total:
+            continue
+        if threshold is None:
+            threshold = raw_decision_threshold(doc.models, ml_prob())
+        radius = math.sqrt(math.log(2 / EARLY_STOP_DELTA) / (2 * n))
+        if abs(doc.prob() - threshold) > radius:
+            doc.stopped_early = True
+            return
+
+def roberta_branch(models, text, log_tag='', ml_prob=None, cancel=None, prescored=None):
+    """Calibrated RoBERTa document probability and the scored DocumentScore.
+
+    In early-stop mode `ml_prob()` supplies the ML ensemble probability that
+    places the decision boundary for the running mean. Once `cancel` is set
+    the branch stops scoring and returns the neutral (0.5, None).
+    """
+    # Split text into chunks and score them
+    doc = DocumentScore(models, text, cancel, prescored)
+    if EARLY_STOP_MODE:
+        score_early_stop(doc, ml_prob or (lambda: 0.5))
+    else:
+        doc.score()
+    if doc.cancel.is_set():
+        print(f"[RoBERTa{log_tag}] Cancelled after {doc.scored}/{len(doc.probs)} chunks")
+        return 0.5, None
+    avg_ai_prob = doc.prob()
+    roberta_ai_prob = calibrate_roberta(avg_ai_prob)
+    
+    print(f"[RoBERTa{log_tag}] Raw={avg_ai_prob:.4f}, Calibrated={roberta_ai_prob:.4f}, "
+          f"chunks={doc.scored}/{len(doc.probs)}")
+    return roberta_ai_prob, doc
+
+def ml_branch(models, text, log_tag=''):
+    """ML ensemble AI probability, neutral 0.5 when it is unavailable or fails"""
+    ml_ai_prob = 0.5  # Default neutral if ML not available
+    
+    if models.ensemble and models.scaler and models.tfidf:
+        try:
+            # Extract features
+            feature_dict = extract_text_features(text)
+            
+            if models.assembler:
+                # Sparse TF-IDF row + numeric features, scaled in place
+                X_scaled = models.assembler.transform(text, feature_dict)
+            else:
+                feature_df = pd.DataFrame([feature_dict])
+                
+                # TF-IDF features
+                tfidf_features = models.tfidf.transform([text]).toarray()
+                tfidf_df = pd.DataFrame(tfidf_features, columns=[f'tfidf_{i}' for i in range(tfidf_features.shape[1])])
+                
+                # Combine features
+                X = pd.concat([feature_df, tfidf_df], axis=1)
+                
+                # Scale
+                X_scaled = models.scaler.transform(X)
+            
+            # Predict
+            ml_ai_prob = models.ensemble.predict_proba(X_scaled)[0][1]
+            
+            print(f"[ML Ensemble{log_tag}] {ml_ai_prob:.4f}")
+            
+        except Exception as e:
+            print(f"[WARN] ML prediction failed: {e}")
+            ml_ai_prob = 0.5  # Neutral fallback
+    
+    return ml_ai_prob
+
+def _branch_result(future, deadline, name, fallback, timeouts):
+    """The branch's result, or `fallback` if it is not done by `deadline` (time.monotonic())"""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FuturesTimeout:
+        print(f"[WARN] {name} branch missed its deadline, using neutral 0.5")
+        timeouts.append(name)
+        return fallback
+
+def _cascade_sample(count, size):
+    """Up to `size` chunk indices spread evenly over the document"""
+    if count <= size:
+        return list(range(count))
+    step = count / size
+    return sorted({int(i * step + step / 2) for i in range(size)})
+
+def run_cascade(models, text, log_tag='', prescored=None):
+    """Cheapest-first scoring: ML ensemble, then a RoBERTa sample, then every chunk.
+
+    RoBERTa only scores the full chunk set when the combined score from the
+    sample lands within CASCADE_MARGIN of the decision threshold.
+    """
+    stages = ['ml']
+    ml_ai_prob = ml_branch(models, text, log_tag)
+    
+    doc = DocumentScore(models, text, prescored=prescored)
+    doc.score(_cascade_sample(len(doc.encoded), CASCADE_SAMPLE_SIZE))
+    stages.append('roberta_sample')
+    combined = combine_probs(models, calibrate_roberta(doc.prob()), ml_ai_prob)
+    
+    if not doc.complete and abs(combined - DECISION_THRESHOLD) <= CASCADE_MARGIN:
+        if EARLY_STOP_MODE:
+            score_early_stop(doc, lambda: ml_ai_prob)
+        else:
+            doc.score()
+        stages.append('roberta_full')
+    
+    roberta_ai_prob = calibrate_roberta(doc.prob())
+    print(f"[Cascade{log_tag}] stages={'+'.join(stages)}, chunks={doc.scored}/{len(doc.probs)}, "
+          f"RoBERTa={roberta_ai_prob:.4f}")
+    return roberta_ai_prob, doc, ml_ai_prob, stages
+
+def analyze_text(models, text, log_tag='', prescored=None):
+    """Run the hybrid RoBERTa + ML ensemble pipeline and build the prediction result.
+
+    `prescored` holds sentence probabilities already computed for this text
+    (see stream_pdf_text()).
+    """
+    # ===========================
+    # 1 + 2. RoBERTa and ML Ensemble Predictions
+    # ===========================
+    
+    timeouts = []
+    if CASCADE_MODE:
+        roberta_ai_prob, doc, ml_ai_prob, stages = run_cascade(models, text, log_tag, prescored)
+    elif PARALLEL_BRANCHES:
+        # Start both branches together; each falls back to neutral once its own
+        # deadline, counted from submission, has passed. ML is queued first, so an
+        # early-stopping RoBERTa branch never waits on an unstarted task
+        cancel = threading.Event()
+        ml_deadline = time.monotonic() + ML_TIMEOUT_S
+        ml_future = branch_executor.submit(ml_branch, models, text, log_tag)
+        ml_prob = lambda: _branch_result(ml_future, ml_deadline, 'ml', 0.5, [])
+        roberta_deadline = time.monotonic() + ROBERTA_TIMEOUT_S
+        roberta_future = branch_executor.submit(roberta_branch, models, text, log_tag, ml_prob, cancel, prescored)
+        roberta_ai_prob, doc = _branch_result(roberta_future, roberta_deadline, 'roberta', (0.5, None), timeouts)
+        if 'roberta' in timeouts:
+            # Stop the abandoned branch from scoring its remaining batches
+            cancel.set()
+        ml_ai_prob = _branch_result(ml_future, ml_deadline, 'ml', 0.5, timeouts)
+        stages = ['ml', 'roberta_full']
+    else:
+        ml_ai_prob = ml_branch(models, text, log_tag)
+        roberta_ai_prob, doc = roberta_branch(models, text, log_tag, lambda: ml_ai_prob, prescored=prescored)
+        stages = ['ml', 'roberta_full']
+    
+    # ===========================
+    # 3. Combine Predictions
+    # ===========================
+    
+    # Weighted average
+    final_ai_prob = combine_probs(models, roberta_ai_prob, ml_ai_prob)
+    if models.ensemble:
+        model_name = 'Hybrid Ensemble (RoBERTa + RF + KNN)'
+    else:
+        model_name = 'RoBERTa ChatGPT Detector'
+    
+    # Decision threshold
+    is_ai = final_ai_prob > DECISION_THRESHOLD
+    
+    print(f"[Final{log_tag}] {final_ai_prob:.4f} -> {'AI' if is_ai else 'Human'}")
+    
+    return {
+        'is_ai': bool(is_ai),
+        'ai_probability': float(final_ai_prob),
+        'human_probability': float(1.0 - final_ai_prob),
+        'label': 'AI' if is_ai else 'Human',
+        'model_name': model_name,
+        'breakdown': {
+            'roberta_prob': float(roberta_ai_prob),
+            'ml_prob': float(ml_ai_prob) if models.ensemble else None,
+            'roberta_weight': float(ROBERTA_WEIGHT),
+            'ml_weight': float(ML_WEIGHT) if models.ensemble else 0.0,
+            'sentences_reused': doc.sentences_reused if doc else 0,
+            'sentences_computed': doc.sentences_computed if doc else 0,
+            'chunks_scored': doc.scored if doc else 0,
+            'chunks_total': len(doc.probs) if doc else 0,
+            'early_stopped': doc.stopped_early if doc else False,
+            'stages': stages,
+            'timed_out': timeouts,
+            'model_version': models.version
+        },
+        'sentence_scores': sentence_scores(doc.spans, doc.probs) if doc else []
+    }
+
+branch_executor = ThreadPoolExecutor(max_workers=BRANCH_EXECUTOR_WORKERS, thread_name_prefix='branch')
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference executor has no free worker or queue slot"""
+
+class BoundedExecutor:
+    """Thread pool that refuses work instead of queueing without limit.
+
+    At most max_workers + max_queue calls are admitted at once; run() raises
+    InferenceQueueFull right away when that many are already in flight.
+    """
+
+    def __init__(self, max_workers, max_queue, thread_name_prefix=''):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self.capacity = max_workers + max_queue
+        self.in_flight = 0
+        self.rejected = 0
+
+    def run(self, fn, *args):
+        """Call fn(*args) on the pool and wait for its result"""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                raise InferenceQueueFull()
+            self.in_flight += 1
+        try:
+            return self._pool.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'capacity': self.capacity, 'in_flight': self.in_flight, 'rejected': self.rejected}
+
+inference_executor = BoundedExecutor(INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE, thread_name_prefix='inference')
+
+def server_busy_response():
+    """503 + Retry-After when the inference executor is full"""
+    response = jsonify({'error': 'Server is busy, retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(BUSY_RETRY_AFTER_S)
+    return response
+
+def cached_analyze(models, text, log_tag='', prescored=None):
+    """analyze_text() behind the content-hash result cache"""
+    key = result_cache_key(models, text)
+    cached = result_cache.get(key)
+    if cached is not None:
+        print(f"[Cache{log_tag}] hit {key[:12]}")
+        return cached
+    
+    result = analyze_text(models, text, log_tag, prescored)
+    if not result['breakdown']['timed_out']:
+        result_cache.put(key, result, size=len(json.dumps(result)) + len(key))
+    return result
+
+def predict_text(text, log_tag=''):
+    """cached_analyze() on the active model bundle"""
+    with model_registry.acquire() as models:
+        return cached_analyze(models, text, log_tag)
+
+# ===========================
+# STREAMING FILE SCORING
+# ===========================
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+class SentenceStream:
+    """Incremental sentence_spans(): feed text piece by piece, get each sentence once it is complete.
+
+    A sentence is complete once the whitespace after it is followed by more
+    text, so the sentences match sentence_spans() on the joined, stripped
+    text. Each comes with the character before it, which the tokenizer needs
+    to reproduce the whole-document leading-space token.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.before = ''
+        self.started = False
+
+    def _cut(self, end, final=False):
+        sentences = []
+        start = 0
+        matches = list(SENTENCE_BOUNDARY.finditer(self.buffer, 0, end))
+        for match in matches + ([None] if final else []):
+            piece_end = match.start() if match else len(self.buffer)
+            piece = self.buffer[start:piece_end]
+            stripped = piece.strip()
+            if len(stripped) > 50:
+                lead = start + len(piece) - len(piece.lstrip())
+                sentences.append((self.buffer[lead - 1] if lead else self.before, stripped))
+            if match:
+                start = match.end()
+        if start:
+            self.before = self.buffer[start - 1]
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def feed(self, piece):
+        if not self.started:
+            # The joined text is stripped, so leading whitespace is not part of it
+            piece = piece.lstrip()
+            if not piece:
+                return []
+            self.started = True
+        self.buffer += piece
+        # A boundary touching the end of the buffer may still grow
+        complete = [m for m in SENTENCE_BOUNDARY.finditer(self.buffer) if m.end() < len(self.buffer)]
+        return self._cut(complete[-1].end()) if complete else []
+
+    def close(self):
+        return self._cut(len(self.buffer), final=True)
+
+def encode_sentences(models, sentences):
+    """Input ids of (preceding char, sentence) pairs, matching what prepare_chunks() cuts for them"""
+    if not SINGLE_PASS_TOKENIZATION or not models.tokenizer.is_fast:
+        return encode_chunks(models, [sentence for _, sentence in sentences])
+    
+    max_tokens = 512 - models.tokenizer.num_special_tokens_to_add()
+    encoding = models.tokenizer([before + sentence for before, sentence in sentences],
+                                add_special_tokens=False, return_offsets_mapping=True)
+    encoded = []
+    for (before, _), ids, offsets in zip(sentences, encoding['input_ids'], encoding['offset_mapping']):
+        first = bisect.bisect_left([start for start, _ in offsets], len(before))
+        encoded.append(models.tokenizer.build_inputs_with_special_tokens(ids[first:first + max_tokens]))
+    return encoded
+
+def threaded_stage(items, maxsize):
+    """Run the iterable `items` on its own thread and yield its output through a bounded queue"""
+    out = queue.Queue(maxsize)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def run():
+        try:
+            for item in items:
+                if not put(item):
+                    return   # the consumer went away
+            put(done)
+        except Exception as e:
+            put(e)
+    
+    threading.Thread(target=run, name='stream-stage', daemon=True).start()
+    try:
+        while True:
+            item = out.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def pdf_page_texts(pdf_source, timings=None):
+    pages = iter_pdf_pages(pdf_source, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, timings)
+    for page_text in pages:
+        yield normalize_text(page_text + '\n')
+
+def sentence_batches(models, pages, parts, prescored):
+    """Split pages into sentences and yield (cache keys, input ids) for those not cached yet.
+
+    Sentences found in the sentence cache go straight into `prescored` as reused.
+    """
+    stream = SentenceStream()
+    batch = []
+    batch_size = SCHEDULER_MAX_BATCH_SIZE if INFERENCE_SCHEDULER else ROBERTA_BATCH_SIZE
+    
+    def pending(sentences):
+        for ids in encode_sentences(models, sentences) if sentences else []:
+            key = sentence_cache_key(models, ids)
+            cached = sentence_cache.get(key)
+            if cached is None:
+                yield key, ids
+            else:
+                prescored[key] = (cached, True)
+    
+    for page in pages:
+        parts.append(page)
+        batch.extend(pending(stream.feed(page)))
+        while len(batch) >= batch_size:
+            chunk, batch = batch[:batch_size], batch[batch_size:]
+            yield [key for key, _ in chunk], [ids for _, ids in chunk]
+    batch.extend(pending(stream.close()))
+    if batch:
+        yield [key for key, _ in batch], [ids for _, ids in batch]
+
+def streaming_enabled():
+    # Cascade and early stopping score only some sentences; prescoring all of them would be wasted
+    return PDF_STREAMING and ROBERTA_SCORING_MODE == 'sentences' and not CASCADE_MODE and not EARLY_STOP_MODE
+
+def stream_pdf_text(models, pdf_source, prescored, timings=None, log_tag=' File'):
+    """Extract a PDF's text while its sentences are scored into `prescored`.
+
+    Page extraction, sentence splitting + tokenization, and RoBERTa scoring
+    run as three overlapping stages joined by bounded queues, so inference
+    starts on the first pages while the rest are still being extracted.
+    `prescored` maps each sentence's cache key to (prob, reused); handed to
+    the prediction that follows on the same bundle, it leaves only the
+    whole-text chunk to score. Scored sentences also go into the sentence
+    cache for later requests. Returns the text of every page, which the ML
+    ensemble and the response still need.
+    """
+    started = time.monotonic()
+    parts = []
+    scored = 0
+    pages = threaded_stage(pdf_page_texts(pdf_source, timings), STREAM_QUEUE_SIZE)
+    for keys, encoded in threaded_stage(sentence_batches(models, pages, parts, prescored), STREAM_QUEUE_SIZE):
+        for key, prob in zip(keys, roberta_chunk_probs(models, encoded)):
+            prescored[key] = (prob, False)
+            sentence_cache.put(key, prob)
+        scored += len(keys)
+    
+    print(f"[Stream{log_tag}] {len(parts)} pages, {scored} sentences scored, "
+          f"{len(prescored) - scored} cached, in {time.monotonic() - started:.2f}s")
+    return parts
+
+# ===========================
+# PROCESS MEMORY
+# ===========================
+
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty', 'Swap')
+
+def process_memory(pid='self'):
+    """RSS, PSS and the shared/private split of one process in kB (Linux smaps_rollup)"""
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in SMAPS_FIELDS:
+                memory[f'{key.lower()}_kb'] = int(value.split()[0])
+    return memory
+
+def worker_memory_report():
+    """Memory of every process in this server's process group: the supervisor and its workers.
+
+    PSS divides each shared page among the processes mapping it, so the
+    PSS total is what the pool really costs the host; RSS counts shared
+    weights once per worker.
+    """
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        return None
+    
+    pgrp = os.getpgrp()
+    exe = os.readlink('/proc/self/exe')
+    processes = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Fields after the parenthesised command name: state, ppid, pgrp, ...
+                if int(f.read().rsplit(')', 1)[1].split()[2]) != pgrp:
+                    continue
+            if os.readlink(f'/proc/{entry}/exe') != exe:
+                continue   # e.g. the shell that launched us
+            memory = process_memory(entry)
+        except (OSError, ValueError, IndexError):
+            continue   # exited meanwhile, or not ours to read
+        processes.append({'pid': int(entry), 'self': int(entry) == os.getpid(), **memory})
+    
+    return {
+        'processes': processes,
+        'total_rss_kb': sum(p.get('rss_kb', 0) for p in processes),
+        'total_pss_kb': sum(p.get('pss_kb', 0) for p in processes),
+    }
+
+# ===========================
+# UPLOADS
+# ===========================
+
+class SpooledUploadRequest(Request):
+    """Request whose file parts are written to a named temp file unless known to be small.
+
+    Parts whose request is at most UPLOAD_SPOOL_MAX_MEMORY bytes stay in
+    memory; larger ones, and bodies of unknown length, go to disk as they
+    arrive so parsers can map or open them by path.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_MAX_MEMORY:
+            return io.BytesIO()
+        return tempfile.NamedTemporaryFile('wb+', prefix='upload-', dir=UPLOAD_TMP_DIR)
+
+app.request_class = SpooledUploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+class UploadBudget:
+    """Request-body bytes admitted at once across this process's requests"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_use = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, size):
+        with self._lock:
+            # A lone request is always admitted; MAX_UPLOAD_BYTES bounds it
+            if self.in_use and self.in_use + size > self.limit:
+                self.rejected += 1
+                return False
+            self.in_use += size
+            return True
+
+    def release(self, size):
+        with self._lock:
+            self.in_use -= size
+
+    def stats(self):
+        with self._lock:
+            return {'limit_bytes': self.limit, 'in_use_bytes': self.in_use, 'rejected': self.rejected}
+
+upload_budget = UploadBudget(UPLOAD_BUDGET_BYTES)
+
+def upload_too_large_response():
+    return jsonify({
+        'error': f'Upload too large: the limit is {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB',
+        'max_bytes': MAX_UPLOAD_BYTES
+    }), 413
+
+def upload_source(file):
+    """Path of a spooled upload, or its bytes when it was kept in memory"""
+    stream = file.stream
+    if isinstance(getattr(stream, 'name', None), str):
+        stream.flush()
+        return stream.name
+    return stream.getvalue()
+
+def upload_sha256(file):
+    """SHA-256 of an upload, read from its stream in blocks"""
+    stream = file.stream
+    stream.seek(0)
+    digest = hashlib.sha256()
+    for block in iter(lambda: stream.read(1024 * 1024), b''):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+# ===========================
+# EXTRACTION CACHE
+# ===========================
+
+# Bump when extraction output changes so stale entries stop matching
+EXTRACTOR_VERSION = 1
+
+class DiskCache:
+    """JSON entries in a directory, evicted least recently used first past max_bytes.
+
+    Safe to share between processes: writes are atomic renames, reads
+    refresh the file's mtime, and eviction tolerates files that another
+    process already removed. Entries are returned without validation, so
+    the cache disables itself unless the directory is owned by this user
+    and not writable by group or others.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.usable = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _check_directory(self):
+        """Create the directory private to this user, or refuse one someone else could plant entries in"""
+        if self.usable is None:
+            try:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                st = os.lstat(self.directory)
+            except OSError as e:
+                print(f"[WARN] Extraction disk cache disabled: {e}")
+                self.usable = False
+                return False
+            problem = None
+            if not stat.S_ISDIR(st.st_mode):
+                problem = 'is not a directory'
+            elif hasattr(os, 'getuid') and st.st_uid != os.getuid():
+                problem = f'is owned by uid {st.st_uid}, not {os.getuid()}'
+            elif st.st_mode & 0o022:
+                problem = f'is writable by group or others (mode {stat.S_IMODE(st.st_mode):o})'
+            if problem:
+                print(f"[WARN] Extraction disk cache disabled: {self.directory} {problem}")
+            self.usable = problem is None
+        return self.usable
+
+    def get(self, key):
+        if not self._check_directory():
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self._check_directory():
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except OSError as e:
+            print(f"[WARN] Extraction cache write failed: {e}")
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'enabled': self.usable is not False,
+        }
+
+extraction_cache = LRUCache(EXTRACTION_CACHE_MAX_ENTRIES, EXTRACTION_CACHE_MAX_BYTES)
+extraction_disk_cache = DiskCache(EXTRACTION_CACHE_DIR, EXTRACTION_CACHE_DISK_BYTES) if EXTRACTION_CACHE_DISK_BYTES else None
+
+def extraction_cache_key(file_ext, file_hash):
+    if file_ext == 'pdf':
+        kind = 'pdf'
+    else:
+        kind = f"docx:{DOCX_INCLUDE_TABLES:d}{DOCX_INCLUDE_HEADERS:d}{DOCX_INCLUDE_FOOTNOTES:d}"
+    return hashlib.sha256(f"{EXTRACTOR_VERSION}\0{kind}\0{file_hash}".encode('utf-8')).hexdigest()
+
+def get_extraction(key):
+    extracted = extraction_cache.get(key)
+    if extracted is None and extraction_disk_cache:
+        extracted = extraction_disk_cache.get(key)
+        if extracted is not None:
+            extraction_cache.put(key, extracted, size=len(extracted['text']))
+    return extracted
+
+def put_extraction(key, extracted):
+    extraction_cache.put(key, extracted, size=len(extracted['text']))
+    if extraction_disk_cache:
+        extraction_disk_cache.put(key, extracted)
+
+def extract_units(models, file, file_ext, prescored):
+    """Normalized text of an upload's pages (PDF) or paragraphs (Word), each ending in a newline"""
+    if file_ext == 'pdf':
+        # Read PDF straight from the spooled upload
+        pdf_source = upload_source(file)
+        timings = []
+        
+        if streaming_enabled():
+            # Extract text from all pages, scoring sentences as they arrive
+            units = stream_pdf_text(models, pdf_source, prescored, timings)
+        else:
+            # Extract text from all pages
+            units = list(pdf_page_texts(pdf_source, timings))
+        log_page_timings(timings, PDF_SLOW_PAGE_S, log_tag=' File')
+        return units
+    
+    # Stream-parse the Word document straight from the spooled upload
+    file.stream.seek(0)
+    paragraphs = iter_docx_paragraphs(file.stream, DOCX_INCLUDE_TABLES, DOCX_INCLUDE_HEADERS, DOCX_INCLUDE_FOOTNOTES)
+    return [normalize_text(paragraph + '\n') for paragraph in paragraphs]
+
+def extract_upload(models, file, file_ext, prescored):
+    """Text of an upload and the end offset of each page/paragraph, parsed once per distinct file.
+
+    Sentence probabilities computed while extracting are added to `prescored`.
+    """
+    key = extraction_cache_key(file_ext, upload_sha256(file))
+    extracted = get_extraction(key)
+    if extracted is not None:
+        print(f"[Extraction Cache] hit {key[:12]}")
+        return extracted
+    
+    units = extract_units(models, file, file_ext, prescored)
+    extracted = {
+        'text': ''.join(units),
+        'unit': 'page' if file_ext == 'pdf' else 'paragraph',
+        'ends': list(itertools.accumulate(len(unit) for unit in units)),
+    }
+    put_extraction(key, extracted)
+    return extracted
+
+def predict_upload(file, file_ext):
+    """(extracted, prediction) for an upload, extracted and scored on one model bundle.
+
+    The prediction is None when the file has no text.
+    """
+    with model_registry.acquire() as models:
+        prescored = {}
+        extracted = extract_upload(models, file, file_ext, prescored)
+        text = extracted['text'].strip()
+        if not text:
+            return extracted, None
+        return extracted, cached_analyze(models, text, ' File', prescored)
+
+# ===========================
+# UPLOAD ADMISSION
+# ===========================
+
+@app.before_request
+def admit_request_body():
+    # Reserve the body size before it is read, so concurrent large uploads
+    # are turned away instead of all being buffered at once
+    if request.method != 'POST':
+        return None
+    size = request.content_length if request.content_length is not None else MAX_UPLOAD_BYTES
+    if size > MAX_UPLOAD_BYTES:
+        return upload_too_large_response()
+    if not upload_budget.reserve(size):
+        response = jsonify({'error': 'Too many uploads in progress, retry shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(BUSY_RETRY_AFTER_S)
+        return response
+    g.upload_reserved = size
+
+@app.teardown_request
+def release_request_body(exc):
+    size = g.pop('upload_reserved', 0)
+    if size:
+        upload_budget.release(size)
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_upload_too_large(e):
+    # Bodies without a Content-Length are only caught while being read
+    return upload_too_large_response()
 
 # ===========================
 # ROUTES
@@ -109,25 +2028,31 @@ print("=" * 60 + "\n")
 
 @app.route('/info', methods=['GET'])
 def get_info():
+    models = model_registry.current()
     models_active = []
-    if roberta_model:
+    if models and models.model:
         models_active.append('RoBERTa')
-    if ml_ensemble:
+    if models and models.ensemble:
         models_active.append('ML Ensemble (RF+KNN)')
     
     return jsonify({
         'model_name': f'Hybrid Ensemble: {" + ".join(models_active)}',
-        'status': 'active' if roberta_model else 'inactive',
+        'status': 'active' if models and models.model else 'inactive',
         'type': 'hybrid_transformer_ml',
         'roberta_weight': ROBERTA_WEIGHT,
-        'ml_weight': ML_WEIGHT if ml_ensemble else 0
+        'ml_weight': ML_WEIGHT if models and models.ensemble else 0,
+        'roberta_source': models.roberta_source if models else None,
+        'versions': models.versions() if models else None,
+        'reloads': model_registry.reloads
     })
 
 @app.route('/predict', methods=['POST'])
 @app.route('/predict-ml', methods=['POST'])
 @app.route('/predict-hybrid', methods=['POST'])
 def predict():
-    if not roberta_model or not roberta_tokenizer:
+    if not model_registry.ready.is_set():
+        return models_loading_response()
+    if not model_registry.current().model:
         return jsonify({'error': 'RoBERTa model not loaded'}), 500
 
     data = request.get_json()
@@ -137,106 +2062,13 @@ def predict():
         return jsonify({'error': 'No text provided'}), 400
 
     try:
-        # ===========================
-        # 1. RoBERTa Prediction
-        # ===========================
-        
-        # Split text into chunks
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 50]
-        
-        if not sentences:
-            sentences = [text]
-            
-        if len(sentences) > 1:
-            chunks = sentences + [text]
-        else:
-            chunks = sentences
-
-        chunk_probs = []
-        
-        for chunk in chunks:
-            inputs = roberta_tokenizer(chunk, return_tensors="pt", truncation=True, max_length=512)
-            
-            with torch.no_grad():
-                outputs = roberta_model(**inputs)
-                probs = F.softmax(outputs.logits, dim=-1)
-                ai_p = float(probs[0][1])
-                chunk_probs.append(ai_p)
-        
-        avg_ai_prob = sum(chunk_probs) / len(chunk_probs)
-        
-        # Apply calibration
-        calibration_factor = 1.35
-        roberta_ai_prob = min(avg_ai_prob * calibration_factor, 1.0)
-        
-        print(f"[RoBERTa] Raw={avg_ai_prob:.4f}, Calibrated={roberta_ai_prob:.4f}")
-        
-        # ===========================
-        # 2. ML Ensemble Prediction
-        # ===========================
-        
-        ml_ai_prob = 0.5  # Default neutral if ML not available
-        
-        if ml_ensemble and ml_scaler and ml_tfidf:
-            try:
-                # Extract features
-                feature_dict = extract_text_features(text)
-                feature_df = pd.DataFrame([feature_dict])
-                
-                # TF-IDF features
-                tfidf_features = ml_tfidf.transform([text]).toarray()
-                tfidf_df = pd.DataFrame(tfidf_features, columns=[f'tfidf_{i}' for i in range(tfidf_features.shape[1])])
-                
-                # Combine features
-                X = pd.concat([feature_df, tfidf_df], axis=1)
-                
-                # Scale
-                X_scaled = ml_scaler.transform(X)
-                
-                # Predict
-                ml_ai_prob = ml_ensemble.predict_proba(X_scaled)[0][1]
-                
-                print(f"[ML Ensemble] {ml_ai_prob:.4f}")
-                
-            except Exception as e:
-                print(f"[WARN] ML prediction failed: {e}")
-                ml_ai_prob = 0.5  # Neutral fallback
-        
-        # ===========================
-        # 3. Combine Predictions
-        # ===========================
-        
-        # Weighted average
-        if ml_ensemble:
-            final_ai_prob = (ROBERTA_WEIGHT * roberta_ai_prob) + (ML_WEIGHT * ml_ai_prob)
-            model_name = 'Hybrid Ensemble (RoBERTa + RF + KNN)'
-        else:
-            final_ai_prob = roberta_ai_prob
-            model_name = 'RoBERTa ChatGPT Detector'
-        
-        # Decision threshold
-        is_ai = final_ai_prob > 0.45
-        
-        print(f"[Final] {final_ai_prob:.4f} -> {'AI' if is_ai else 'Human'}")
+        result = inference_executor.run(predict_text, normalize_text(text))
         print("-" * 60)
         
-        result = {
-            'is_ai': bool(is_ai),
-            'ai_probability': float(final_ai_prob),
-            'human_probability': float(1.0 - final_ai_prob),
-            'label': 'AI' if is_ai else 'Human',
-            'model_name': model_name,
-            'breakdown': {
-                'roberta_prob': float(roberta_ai_prob),
-                'ml_prob': float(ml_ai_prob) if ml_ensemble else None,
-                'roberta_weight': float(ROBERTA_WEIGHT),
-                'ml_weight': float(ML_WEIGHT) if ml_ensemble else 0.0
-            }
-        }
-        
         return jsonify(result)
         
+    except InferenceQueueFull:
+        return server_busy_response()
     except Exception as e:
         import traceback
         print("ERROR:", str(e))
@@ -246,7 +2078,9 @@ def predict():
 @app.route('/predict-file', methods=['POST'])
 def predict_file():
     """Predict AI content from uploaded Word or PDF file"""
-    if not roberta_model or not roberta_tokenizer:
+    if not model_registry.ready.is_set():
+        return models_loading_response()
+    if not model_registry.current().model:
         return jsonify({'error': 'RoBERTa model not loaded'}), 500
     
     # Check if file is present
@@ -266,154 +2100,233 @@ def predict_file():
         return jsonify({'error': 'Only PDF and Word (.docx, .doc) files are supported'}), 400
     
     try:
-        # Extract text based on file type
-        text = ''
-        
-        if file_ext == 'pdf':
-            # Read PDF
-            pdf_file = io.BytesIO(file.read())
-            pdf_reader = PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            for page in pdf_reader.pages:
-                text += page.extract_text() + '\n'
-        
-        elif file_ext in ['docx', 'doc']:
-            # Read Word document
-            doc_file = io.BytesIO(file.read())
-            doc = Document(doc_file)
-            
-            # Extract text from all paragraphs
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + '\n'
-        
-        # Clean up text
-        text = text.strip()
+        # Extract text based on file type (already normalized per page/paragraph)
+        # and predict on it, both on the bounded inference executor
+        extracted, result = inference_executor.run(predict_upload, file, file_ext)
         
-        if not text:
+        if result is None:
             return jsonify({'error': 'No text found in the file'}), 400
         
-        # Use the same prediction logic as /predict endpoint
-        # ===========================
-        # 1. RoBERTa Prediction
-        # ===========================
-        
-        # Split text into chunks
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 50]
-        
-        if not sentences:
-            sentences = [text]
-            
-        if len(sentences) > 1:
-            chunks = sentences + [text]
-        else:
-            chunks = sentences
-
-        chunk_probs = []
-        
-        for chunk in chunks:
-            inputs = roberta_tokenizer(chunk, return_tensors="pt", truncation=True, max_length=512)
-            
-            with torch.no_grad():
-                outputs = roberta_model(**inputs)
-                probs = F.softmax(outputs.logits, dim=-1)
-                ai_p = float(probs[0][1])
-                chunk_probs.append(ai_p)
-        
-        avg_ai_prob = sum(chunk_probs) / len(chunk_probs)
-        
-        # Apply calibration
-        calibration_factor = 1.35
-        roberta_ai_prob = min(avg_ai_prob * calibration_factor, 1.0)
-        
-        print(f"[RoBERTa File] Raw={avg_ai_prob:.4f}, Calibrated={roberta_ai_prob:.4f}")
-        
-        # ===========================
-        # 2. ML Ensemble Prediction
-        # ===========================
-        
-        ml_ai_prob = 0.5  # Default neutral if ML not available
-        
-        if ml_ensemble and ml_scaler and ml_tfidf:
-            try:
-                # Extract features
-                feature_dict = extract_text_features(text)
-                feature_df = pd.DataFrame([feature_dict])
-                
-                # TF-IDF features
-                tfidf_features = ml_tfidf.transform([text]).toarray()
-                tfidf_df = pd.DataFrame(tfidf_features, columns=[f'tfidf_{i}' for i in range(tfidf_features.shape[1])])
-                
-                # Combine features
-                X = pd.concat([feature_df, tfidf_df], axis=1)
-                
-                # Scale
-                X_scaled = ml_scaler.transform(X)
-                
-                # Predict
-                ml_ai_prob = ml_ensemble.predict_proba(X_scaled)[0][1]
-                
-                print(f"[ML Ensemble File] {ml_ai_prob:.4f}")
-                
-            except Exception as e:
-                print(f"[WARN] ML prediction failed: {e}")
-                ml_ai_prob = 0.5  # Neutral fallback
-        
-        # ===========================
-        # 3. Combine Predictions
-        # ===========================
-        
-        # Weighted average
-        if ml_ensemble:
-            final_ai_prob = (ROBERTA_WEIGHT * roberta_ai_prob) + (ML_WEIGHT * ml_ai_prob)
-            model_name = 'Hybrid Ensemble (RoBERTa + RF + KNN)'
-        else:
-            final_ai_prob = roberta_ai_prob
-            model_name = 'RoBERTa ChatGPT Detector'
-        
-        # Decision threshold
-        is_ai = final_ai_prob > 0.45
+        # Clean up text
+        text = extracted['text'].strip()
+        lead = len(extracted['text']) - len(extracted['text'].lstrip())
+        result = dict(result)
         
-        print(f"[Final File] {final_ai_prob:.4f} -> {'AI' if is_ai else 'Human'}")
         print(f"[File] {filename} ({file_ext.upper()})")
         print("-" * 60)
         
-        result = {
-            'is_ai': bool(is_ai),
-            'ai_probability': float(final_ai_prob),
-            'human_probability': float(1.0 - final_ai_prob),
-            'label': 'AI' if is_ai else 'Human',
-            'model_name': model_name,
+        result.update({
             'filename': filename,
             'file_type': file_ext.upper(),
             'text_length': len(text),
             'word_count': len(text.split()),
             'extracted_text': text,  # Return the extracted text for highlighting
-            'breakdown': {
-                'roberta_prob': float(roberta_ai_prob),
-                'ml_prob': float(ml_ai_prob) if ml_ensemble else None,
-                'roberta_weight': float(ROBERTA_WEIGHT),
-                'ml_weight': float(ML_WEIGHT) if ml_ensemble else 0.0
+            'segments': {
+                'unit': extracted['unit'],
+                'ends': [min(max(end - lead, 0), len(text)) for end in extracted['ends']]
             }
-        }
+        })
         
         return jsonify(result)
         
+    except InferenceQueueFull:
+        return server_busy_response()
     except Exception as e:
         import traceback
         print("ERROR (File Upload):", str(e))
         print(traceback.format_exc())
         return jsonify({'error': f'Failed to process file: {str(e)}'}), 500
 
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    with inference_stats_lock:
+        stats = dict(inference_stats)
+    total = stats['real_tokens'] + stats['padded_tokens']
+    stats['padding_ratio'] = stats['padded_tokens'] / total if total else 0.0
+    stats['padded_tokens_saved'] = stats['unbucketed_padded_tokens'] - stats['padded_tokens']
+    return jsonify({
+        'inference': stats,
+        'executor': inference_executor.stats(),
+        'uploads': upload_budget.stats(),
+        'result_cache': result_cache.stats(),
+        'sentence_cache': sentence_cache.stats(),
+        'extraction_cache': extraction_cache.stats(),
+        'extraction_disk_cache': extraction_disk_cache.stats() if extraction_disk_cache else None,
+        'memory': worker_memory_report()
+    })
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    models = model_registry.current()
+    ready = model_registry.ready.is_set() and models.model is not None
+    return jsonify({
+        'ready': ready,
+        'models': model_registry.status(),
+        'model_version': models.version if models else None
+    }), 200 if ready else 503
+
 @app.route('/health', methods=['GET'])
 def health_check():
+    models = model_registry.current()
     return jsonify({
         'status': 'healthy',
-        'roberta_loaded': roberta_model is not None,
-        'ml_ensemble_loaded': ml_ensemble is not None
+        'roberta_loaded': models is not None and models.model is not None,
+        'ml_ensemble_loaded': models is not None and models.ensemble is not None
     })
 
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    """Load new model versions in the background and swap them in atomically.
+
+    Optional JSON body: {"roberta_model": "<HF name | local dir | finetuned>"};
+    without it the current source is reloaded from disk.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled (ADMIN_TOKEN is not set)'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 401
+    if not model_registry.ready.is_set():
+        return models_loading_response()
+    
+    data = request.get_json(silent=True) or {}
+    source = data.get('roberta_model') or model_registry.roberta_source
+    if reload_fanout:
+        # Every worker, this one included, picks the request up and reloads in turn
+        reload_fanout.publish(source)
+    elif not model_registry.start_reload(source):
+        return jsonify({'error': 'A reload is already in progress'}), 409
+    
+    return jsonify({
+        'status': 'reloading',
+        'roberta_source': source,
+        'active_versions': model_registry.current().versions()
+    }), 202
+
+# Under `python app.py`, PDF extraction pool workers re-import this script as
+# __mp_main__; they only need extraction.py, not the models
+if __name__ != '__mp_main__' and not DEFER_MODEL_LOADING:
+    start_model_loading()
+
+# ===========================
+# PRE-FORK WORKER POOL
+# ===========================
+
+def freeze_for_fork():
+    """Move everything allocated so far out of the GC's reach, so collections
+    in forked workers do not write to (and un-share) the parent's pages"""
+    gc.collect()
+    gc.freeze()
+
+def init_worker(workers, connection_threads=None):
+    """Per-process setup in a freshly forked worker; returns its torch thread count.
+
+    Each of the `workers` processes gets a 1/N share of the cores for torch
+    so they do not oversubscribe, then starts its model loader (when loading
+    was deferred past the fork) and the model file watcher.
+    """
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    torch.set_num_threads(torch_threads)
+    if connection_threads and inference_executor.capacity >= connection_threads:
+        print(f"[WARN] Inference executor admits {inference_executor.capacity} predictions but the worker "
+              f"has {connection_threads} connection threads, so it never answers 503; "
+              f"lower INFERENCE_QUEUE_SIZE")
+    if reload_fanout:
+        # A worker that loads its own models starts from the latest requested source;
+        # one that inherited them catches up with any reload since they were loaded
+        seen = 0
+        if DEFER_MODEL_LOADING:
+            seen, source = reload_fanout.latest()
+            model_registry.roberta_source = source or model_registry.roberta_source
+        threading.Thread(target=_follow_reload_requests, args=(seen,), name='reload-follower', daemon=True).start()
+    if DEFER_MODEL_LOADING:
+        start_model_loading()
+    start_model_watcher()
+    return torch_threads
+
+def serve_prefork(workers, host='0.0.0.0', port=5000):
+    """Serve the app from `workers` forked processes sharing the loaded models.
+
+    The supervisor finishes loading RoBERTa and the ML artifacts first;
+    fork() then gives every worker those weights copy-on-write. All workers
+    accept on one listening socket, each with a 1/N share of the cores for
+    torch so they do not oversubscribe. Dead workers are replaced.
+    """
+    from werkzeug.serving import make_server
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+    
+    # Workers must inherit loaded weights, not start their own loader
+    model_registry.ready.wait()
+    share_reloads_with_workers()
+    freeze_for_fork()
+    
+    children = set()
+    shutting_down = False
+    
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            threads_per_worker = init_worker(workers)
+            server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+            memory = process_memory() if os.path.exists('/proc/self/smaps_rollup') else {}
+            print(f"[Worker {os.getpid()}] serving with {threads_per_worker} torch thread(s), "
+                  f"RSS={memory.get('rss_kb', 0) // 1024}MB PSS={memory.get('pss_kb', 0) // 1024}MB")
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.add(pid)
+    
+    def shutdown(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    print(f"[Supervisor {os.getpid()}] {workers} workers on http://{host}:{port}")
+    for _ in range(workers):
+        spawn()
+    
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not shutting_down:
+            print(f"[Supervisor] worker {pid} exited ({status}), restarting")
+            spawn()
+    sock.close()
+
 if __name__ == '__main__':
-    # Disable reloader to prevent connection resets during file uploads
-    app.run(debug=True, port=5000, use_reloader=False, threaded=True)
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='AI detector API server')
+    parser.add_argument('--host', default=os.environ.get('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '5000')))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', '1')),
+                        help='Fork this many worker processes sharing the loaded models')
+    args = parser.parse_args()
+    
+    if args.workers > 1:
+        serve_prefork(args.workers, args.host, args.port)
+    else:
+        start_model_watcher()
+        # Development server; production runs under gunicorn (see gunicorn.conf.py)
+        # Disable reloader to prevent connection resets during file uploads
+        app.run(debug=os.environ.get('FLASK_DEBUG', '0') == '1', host=args.host, port=args.port,
+                use_reloader=False, threaded=True)
@@ -0,0 +1,235 @@
+"""
+Text extraction for uploaded documents.
+
+PyPDF2's page.extract_text() is pure Python and CPU-bound. For large PDFs
+iter_pdf_pages() splits the page list into contiguous ranges, extracts them
+in a process pool and yields the text back in page order as each range
+finishes; small PDFs are extracted serially in the calling thread.
+
+iter_docx_paragraphs() stream-parses word/document.xml straight out of the
+DOCX zip instead of building python-docx's object model, and yields the same
+text as python-docx's Document(...).paragraphs.
+
+This module must not import app, so the pool's worker processes can import
+it on their own. Like every non-fork multiprocessing child, each worker also
+re-imports the parent's __main__ script under the name __mp_main__: nothing
+under gunicorn, but app.py itself under `python app.py`, which is why app.py
+skips model loading in that case (its imports, torch and transformers
+included, still run).
+"""
+
+import io
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+from PyPDF2 import PdfReader
+
+
+def open_pdf(source):
+    """PdfReader over raw bytes or a file path.
+
+    Files are memory-mapped rather than read: PdfReader given a path would
+    copy the whole file into a BytesIO first.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                # The mapping stays valid after the file is closed
+                return PdfReader(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        source = b''
+    return PdfReader(io.BytesIO(source))
+
+
+def extract_pdf_range(source, start, end):
+    """(text, seconds) for pages [start, end); runs inside a pool worker"""
+    reader = open_pdf(source)
+    pages = []
+    for page in reader.pages[start:end]:
+        started = time.perf_counter()
+        text = page.extract_text()
+        pages.append((text, time.perf_counter() - started))
+    return pages
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """This process's extraction pool, or None where worker processes cannot start cleanly"""
+    global _pool, _pool_pid
+    # forkserver children are forked from a small server process instead of this
+    # threaded one, which plain fork would make unsafe. The server preloads this
+    # module; each child still re-imports __main__ as __mp_main__ (see above)
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return None
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def page_ranges(count, parts):
+    """Split range(count) into at most `parts` contiguous (start, end) ranges of near-equal size"""
+    parts = max(1, min(parts, count))
+    bounds = [count * i // parts for i in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_pdf_pages(source, workers=0, min_pages=16, timings=None):
+    """Yield the text of every page in order, extracting in parallel for large PDFs.
+
+    `timings`, when given, receives (page number, seconds) for every page.
+    """
+    reader = open_pdf(source)
+    count = len(reader.pages)
+    pool = get_pool(workers) if workers > 1 and count >= min_pages else None
+
+    if pool is None:
+        for number, page in enumerate(reader.pages, 1):
+            started = time.perf_counter()
+            text = page.extract_text()
+            if timings is not None:
+                timings.append((number, time.perf_counter() - started))
+            yield text
+        return
+
+    # Two ranges per worker so one slow range does not leave the others idle
+    ranges = page_ranges(count, workers * 2)
+    futures = [pool.submit(extract_pdf_range, source, start, end) for start, end in ranges]
+    try:
+        for (start, _), future in zip(ranges, futures):
+            for offset, (text, seconds) in enumerate(future.result()):
+                if timings is not None:
+                    timings.append((start + offset + 1, seconds))
+                yield text
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def log_page_timings(timings, slow_s, log_tag=''):
+    """Print the extraction total and every page slower than slow_s"""
+    if not timings:
+        return
+    total = sum(seconds for _, seconds in timings)
+    slowest = max(timings, key=lambda item: item[1])
+    print(f"[PDF{log_tag}] {len(timings)} pages, {total:.2f}s extraction CPU, "
+          f"slowest page {slowest[0]} ({slowest[1]:.2f}s)")
+    for number, seconds in timings:
+        if seconds > slow_s:
+            print(f"   [WARN] page {number} took {seconds:.2f}s to extract")
+
+
+# WordprocessingML element names
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY, W_P, W_R, W_HYPERLINK, W_TBL = W + 'body', W + 'p', W + 'r', W + 'hyperlink', W + 'tbl'
+W_T, W_TAB, W_PTAB, W_BR, W_CR, W_NO_BREAK_HYPHEN = W + 't', W + 'tab', W + 'ptab', W + 'br', W + 'cr', W + 'noBreakHyphen'
+W_TYPE = W + 'type'
+W_FOOTNOTE, W_ENDNOTE = W + 'footnote', W + 'endnote'
+
+# The parser settings python-docx uses, so whitespace handling matches
+XML_PARSE_OPTIONS = {'remove_blank_text': True, 'resolve_entities': False}
+
+
+def run_text(run):
+    """Text of a w:r element, as python-docx's Run.text"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append('\t')
+        elif tag == W_BR:
+            # Only line breaks read as text; page and column breaks are dropped
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag == W_CR:
+            parts.append('\n')
+        elif tag == W_NO_BREAK_HYPHEN:
+            parts.append('-')
+    return ''.join(parts)
+
+
+def paragraph_text(paragraph):
+    """Text of a w:p element, as python-docx's Paragraph.text: direct runs and hyperlinked runs"""
+    parts = []
+    for child in paragraph:
+        if child.tag == W_R:
+            parts.append(run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(run_text(run) for run in child if run.tag == W_R)
+    return ''.join(parts)
+
+
+def _release(element):
+    # Drop parsed siblings so memory stays flat however long the document is
+    element.clear()
+    while element.getprevious() is not None:
+        del element.getparent()[0]
+
+
+def main_document_part(docx):
+    """Zip member holding the document body, found through the package relationships"""
+    with docx.open('_rels/.rels') as xml:
+        for rel in etree.parse(xml, etree.XMLParser(**XML_PARSE_OPTIONS)).getroot():
+            if rel.get('Type', '').endswith('/officeDocument'):
+                return rel.get('Target').lstrip('/')
+    return 'word/document.xml'
+
+
+def _iter_body(docx, tables):
+    with docx.open(main_document_part(docx)) as xml:
+        for _, element in etree.iterparse(xml, events=('end',), **XML_PARSE_OPTIONS):
+            parent = element.getparent()
+            if parent is None or parent.tag != W_BODY:
+                continue
+            if element.tag == W_P:
+                yield paragraph_text(element)
+            elif element.tag == W_TBL and tables:
+                # Cell paragraphs in document order, nested tables included
+                for paragraph in element.iter(W_P):
+                    yield paragraph_text(paragraph)
+            _release(element)
+
+
+def _iter_part_paragraphs(docx, name):
+    """Paragraphs of a header, footer, footnotes or endnotes part, skipping separator notes"""
+    with docx.open(name) as xml:
+        root = etree.parse(xml, etree.XMLParser(**XML_PARSE_OPTIONS)).getroot()
+    for note in list(root.iter(W_FOOTNOTE, W_ENDNOTE)):
+        if note.get(W_TYPE) in ('separator', 'continuationSeparator', 'continuationNotice'):
+            note.getparent().remove(note)
+    for paragraph in root.iter(W_P):
+        yield paragraph_text(paragraph)
+
+
+def iter_docx_paragraphs(source, tables=False, headers=False, footnotes=False):
+    """Yield the text of every body paragraph of a DOCX (path or binary file object).
+
+    With only the defaults this is exactly python-docx's
+    [p.text for p in Document(source).paragraphs]. `tables` adds the
+    paragraphs of body tables where they occur, `headers` puts header and
+    footer paragraphs first, `footnotes` puts footnotes and endnotes last.
+    """
+    with zipfile.ZipFile(source) as docx:
+        names = docx.namelist()
+        if headers:
+            for name in sorted(n for n in names if n.startswith(('word/header', 'word/footer')) and n.endswith('.xml')):
+                yield from _iter_part_paragraphs(docx, name)
+        yield from _iter_body(docx, tables)
+        if footnotes:
+            for name in ('word/footnotes.xml', 'word/endnotes.xml'):
+                if name in names:
+                    yield from _iter_part_paragraphs(docx, name)
@@ -0,0 +1,64 @@
+# Production server configuration
+#
+#     gunicorn --config gunicorn.conf.py app:app
+#
+# The app's code is imported once in the master and shared by the forked
+# workers. Each worker serves connections on a pool of threads; predictions
+# themselves run on the app's bounded inference executor
+# (INFERENCE_WORKERS / INFERENCE_QUEUE_SIZE), whose default queue is sized to
+# leave a few of the WEB_THREADS connection threads free, so a full executor
+# answers 503 instead of leaving requests in the accept backlog.
+#
+# Where the models are loaded depends on BACKGROUND_MODEL_LOADING:
+#
+#   1 (default)  Every worker loads its own models in a background thread after
+#                it forks. Workers accept connections straight away and answer
+#                503 until loaded, so GET /ready (not /info) is the health
+#                check. With ROBERTA_MMAP_WEIGHTS=1 and ROBERTA_MODEL pointing at
+#                the Model_training/export_safetensors.py output, the RoBERTa
+#                weights are still shared through the page cache; the ML
+#                ensemble is per worker.
+#   0            The master loads every model before forking, so workers share
+#                all weights copy-on-write, but the port is only bound once
+#                loading has finished.
+#
+# POST /admin/reload and the model file watcher reach every worker, and the
+# workers reload one at a time. Each reloaded worker then holds its own copy of
+# the new weights (apart from memory-mapped RoBERTa weights), so on a host
+# without room for that, restart the server instead.
+
+import os
+
+BACKGROUND_MODEL_LOADING = os.environ.get('BACKGROUND_MODEL_LOADING', '1') == '1'
+if BACKGROUND_MODEL_LOADING:
+    # A loader thread started in the master would not survive the fork
+    os.environ['DEFER_MODEL_LOADING'] = '1'
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_WORKERS', '1'))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', '16'))
+preload_app = True
+
+# Long documents can take a while on CPU
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+backlog = int(os.environ.get('GUNICORN_BACKLOG', '2048'))
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    import app
+
+    app.share_reloads_with_workers()
+    app.freeze_for_fork()
+
+
+def post_fork(server, worker):
+    import app
+
+    torch_threads = app.init_worker(server.cfg.workers, server.cfg.threads)
+    server.log.info("Worker %s using %s torch thread(s)", worker.pid, torch_threads)
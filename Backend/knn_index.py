@@ -0,0 +1,107 @@
+"""
+Approximate nearest-neighbour stand-in for the KNN member of the ML ensemble.
+
+Exact KNN compares every request against every stored training row across
+all 111 scaled features. ReducedKNNClassifier projects the stored rows onto
+a few PCA components once, indexes them (HNSW via hnswlib when installed,
+otherwise a KD-tree, which is fast at low dimension), and votes over the
+neighbours found there exactly as KNeighborsClassifier would.
+
+Build the index with Model_training/build_knn_index.py; the backend swaps it
+into the loaded ensemble when ML_KNN_ANN=1.
+"""
+
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.neighbors import KNeighborsClassifier, NearestNeighbors
+
+
+class ReducedKNNClassifier:
+    """predict_proba-compatible KNN over a PCA-reduced approximate index"""
+
+    def __init__(self, knn, n_components=32, backend='auto', ef_search=64):
+        fit_X = np.asarray(knn._fit_X, dtype=np.float32)
+        self.classes_ = knn.classes_
+        self.n_neighbors = knn.n_neighbors
+        self.weights = knn.weights
+        self.n_features_in_ = fit_X.shape[1]
+        self._y = np.asarray(knn._y).ravel()
+
+        n_components = min(n_components, fit_X.shape[1], fit_X.shape[0])
+        self.pca = PCA(n_components=n_components, random_state=42).fit(fit_X)
+        reduced = self.pca.transform(fit_X).astype(np.float32)
+
+        self.backend = backend
+        if backend in ('auto', 'hnsw'):
+            try:
+                import hnswlib
+                self.index = hnswlib.Index(space='l2', dim=n_components)
+                self.index.init_index(max_elements=len(reduced), ef_construction=200, M=16)
+                self.index.add_items(reduced, np.arange(len(reduced)))
+                self.index.set_ef(max(ef_search, self.n_neighbors))
+                self.backend = 'hnsw'
+            except ImportError:
+                if backend == 'hnsw':
+                    raise
+                self.backend = 'kd_tree'
+        if self.backend == 'kd_tree':
+            self.index = NearestNeighbors(n_neighbors=self.n_neighbors, algorithm='kd_tree').fit(reduced)
+
+    def kneighbors(self, X, n_neighbors=None):
+        """(distances, indices) of the approximate nearest stored rows"""
+        k = n_neighbors or self.n_neighbors
+        reduced = self.pca.transform(np.asarray(X, dtype=np.float32)).astype(np.float32)
+        if self.backend == 'hnsw':
+            indices, sq_distances = self.index.knn_query(reduced, k=k)
+            return np.sqrt(np.maximum(sq_distances, 0)), indices.astype(np.intp)
+        return self.index.kneighbors(reduced, n_neighbors=k)
+
+    def predict_proba(self, X):
+        distances, indices = self.kneighbors(X)
+        labels = self._y[indices]
+
+        if self.weights == 'distance':
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / distances
+            # Exact matches take all the weight, as in scikit-learn
+            exact = np.isinf(weights)
+            rows = exact.any(axis=1)
+            weights[rows] = exact[rows].astype(float)
+        else:
+            weights = np.ones_like(distances, dtype=float)
+
+        proba = np.zeros((len(labels), len(self.classes_)))
+        for c in range(len(self.classes_)):
+            proba[:, c] = np.sum(weights * (labels == c), axis=1)
+        proba /= proba.sum(axis=1, keepdims=True)
+        return proba
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+KNN_TYPES = (KNeighborsClassifier, ReducedKNNClassifier)
+
+
+def find_knn_members(ensemble):
+    """(container, index) locations of the KNN member(s), exact or indexed, in the ensemble"""
+    estimators = getattr(ensemble, 'estimators_', None)
+    if not isinstance(estimators, list):
+        return []
+    return [(estimators, i) for i, est in enumerate(estimators) if isinstance(est, KNN_TYPES)]
+
+
+def install_knn_index(ensemble, replacement):
+    """Swap the KNN member(s) of a fitted Voting/Stacking ensemble; returns the count.
+
+    Passing the original KNeighborsClassifier back restores exact search.
+    """
+    members = find_knn_members(ensemble)
+    for container, i in members:
+        container[i] = replacement
+    named = getattr(ensemble, 'named_estimators_', None)
+    if named is not None:
+        for name, est in list(named.items()):
+            if isinstance(est, KNN_TYPES):
+                named[name] = replacement
+    return len(members)
@@ -0,0 +1,105 @@
+"""
+Shared fixtures for the backend tests.
+
+app is imported offline with models loaded synchronously; the real model
+loads fail fast and `bundle` swaps a tiny randomly initialised RoBERTa and a
+small ML ensemble into the active model bundle, so the tests exercise the
+real tokenization, scoring and feature paths in seconds.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('BACKGROUND_MODEL_LOADING', '0')
+os.environ.setdefault('MODEL_WATCH_INTERVAL_S', '0')
+os.environ.setdefault('EXTRACTION_CACHE_DIR', tempfile.mkdtemp(prefix='ai_detector_tests_'))
+
+TOKENIZER_CORPUS = [
+    "The quick brown fox jumps over the lazy dog near the riverbank today.",
+    "Artificial intelligence has transformed many industries in recent years!",
+    "Is this sentence written by a person, or generated by a model?",
+]
+
+ML_TRAINING_TEXTS = [
+    f"Sample text number {i}, with words {' '.join(str(j) for j in range(i % 7))} and more. Really{'!' * (i % 3)}"
+    for i in range(200)
+]
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    pytest.importorskip('torch')
+    pytest.importorskip('transformers')
+    import app
+    return app
+
+
+@pytest.fixture(scope='session')
+def tiny_roberta(tmp_path_factory):
+    """(tokenizer, model): a byte-level BPE RoBERTa tokenizer and a 2-layer classifier"""
+    torch = pytest.importorskip('torch')
+    tokenizers = pytest.importorskip('tokenizers')
+    from transformers import RobertaConfig, RobertaForSequenceClassification, RobertaTokenizerFast
+
+    directory = tmp_path_factory.mktemp('tokenizer')
+    bpe = tokenizers.ByteLevelBPETokenizer()
+    bpe.train_from_iterator(TOKENIZER_CORPUS * 50, vocab_size=400,
+                            special_tokens=["<s>", "<pad>", "</s>", "<unk>", "<mask>"])
+    bpe.save_model(str(directory))
+    tokenizer = RobertaTokenizerFast(vocab_file=str(directory / 'vocab.json'),
+                                     merges_file=str(directory / 'merges.txt'))
+
+    torch.manual_seed(0)
+    config = RobertaConfig(vocab_size=tokenizer.vocab_size + 5, hidden_size=32, num_hidden_layers=2,
+                           num_attention_heads=2, intermediate_size=64, max_position_embeddings=520,
+                           num_labels=2)
+    return tokenizer, RobertaForSequenceClassification(config).eval()
+
+
+@pytest.fixture(scope='session')
+def ml_models(app_module):
+    """(ensemble, scaler, tfidf, feature_names) fitted on pandas frames, as the training scripts do"""
+    from sklearn.ensemble import RandomForestClassifier, VotingClassifier
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.neighbors import KNeighborsClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    tfidf = TfidfVectorizer(max_features=100).fit(ML_TRAINING_TEXTS)
+    X = ml_frame(app_module, tfidf, ML_TRAINING_TEXTS)
+    scaler = StandardScaler().fit(X)
+    ensemble = VotingClassifier(
+        [('rf', RandomForestClassifier(n_estimators=10, random_state=0)), ('knn', KNeighborsClassifier(5))],
+        voting='soft',
+    ).fit(scaler.transform(X), np.arange(len(ML_TRAINING_TEXTS)) % 2)
+    return ensemble, scaler, tfidf, list(X.columns)
+
+
+def ml_frame(app_module, tfidf, texts):
+    """Handcrafted + TF-IDF feature frame, as ml_branch builds it without an assembler"""
+    import pandas as pd
+
+    features = pd.DataFrame([app_module.extract_text_features(text) for text in texts])
+    dense = tfidf.transform(texts).toarray()
+    return pd.concat([features, pd.DataFrame(dense, columns=[f'tfidf_{i}' for i in range(dense.shape[1])])], axis=1)
+
+
+@pytest.fixture
+def bundle(app_module, tiny_roberta, ml_models, monkeypatch):
+    """The active model bundle with the test models in place and every cache empty"""
+    active = app_module.model_registry.current()
+    active.tokenizer, active.model = tiny_roberta
+    ensemble, scaler, tfidf, names = ml_models
+    active.ensemble, active.scaler, active.tfidf = ensemble, scaler, tfidf
+    active.assembler = app_module.FeatureAssembler(scaler, tfidf, names)
+    active.version, active.roberta_version = 'tests', 'tests-roberta'
+    for name in ('result_cache', 'sentence_cache', 'extraction_cache'):
+        monkeypatch.setattr(app_module, name, app_module.LRUCache(getattr(app_module, name).max_entries))
+    return active
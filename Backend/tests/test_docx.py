@@ -0,0 +1,88 @@
+"""iter_docx_paragraphs() must yield exactly python-docx's paragraph texts."""
+
+import random
+
+import pytest
+
+import extraction
+
+docx = pytest.importorskip('docx')
+from docx.enum.text import WD_BREAK
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+
+
+def python_docx_paragraphs(path):
+    return [p.text for p in docx.Document(path).paragraphs]
+
+
+@pytest.fixture
+def rich_docx(tmp_path):
+    """Runs with tabs and breaks, hyperlinks, tracked changes, a table, a content control and a header"""
+    document = docx.Document()
+    p = document.add_paragraph('Hello')
+    run = p.add_run(' world')
+    run.add_tab()
+    run.add_text('after tab')
+    run.add_break()
+    run.add_text('line two')
+    run = p.add_run('x')
+    run.add_break(WD_BREAK.PAGE)
+    run.add_text('y')
+    run.add_break(WD_BREAK.COLUMN)
+    p._p.append(parse_xml(
+        f'<w:hyperlink {nsdecls("w", "r")} r:id="rId99"><w:r><w:t>link text</w:t></w:r>'
+        f'<w:r><w:tab/><w:t xml:space="preserve"> two </w:t></w:r></w:hyperlink>'
+    ))
+    p._p.append(parse_xml(
+        f'<w:r {nsdecls("w")}><w:t>a</w:t><w:cr/><w:noBreakHyphen/>'
+        f'<w:ptab w:relativeTo="margin" w:alignment="left" w:leader="none"/><w:softHyphen/>'
+        f'<w:delText>gone</w:delText><w:t/></w:r>'
+    ))
+    p._p.append(parse_xml(
+        f'<w:ins {nsdecls("w")} w:id="1" w:author="a" w:date="2024-01-01T00:00:00Z"><w:r><w:t>inserted</w:t></w:r></w:ins>'
+    ))
+    document.add_paragraph('')
+    document.add_paragraph('  spaced  ')
+    table = document.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = 'cell A'
+    table.cell(1, 1).text = 'cell D'
+    document.element.body.insert(len(document.element.body) - 1, parse_xml(
+        f'<w:sdt {nsdecls("w")}><w:sdtContent><w:p><w:r><w:t>in sdt</w:t></w:r></w:p></w:sdtContent></w:sdt>'
+    ))
+    document.add_paragraph('Résumé café — naïve')
+    document.sections[0].header.paragraphs[0].text = 'Header line'
+    rng = random.Random(0)
+    for i in range(50):
+        document.add_paragraph(f'Para {i} ' + ' '.join(rng.choice(['word', 'tab\tbed', 'x']) for _ in range(30)))
+    path = tmp_path / 'rich.docx'
+    document.save(path)
+    return str(path)
+
+
+def test_matches_python_docx(rich_docx):
+    assert list(extraction.iter_docx_paragraphs(rich_docx)) == python_docx_paragraphs(rich_docx)
+
+
+def test_file_object_matches_path(rich_docx):
+    with open(rich_docx, 'rb') as f:
+        assert list(extraction.iter_docx_paragraphs(f)) == python_docx_paragraphs(rich_docx)
+
+
+def test_optional_parts(rich_docx):
+    body = python_docx_paragraphs(rich_docx)
+
+    # Cell paragraphs row by row, where the table sits in the body
+    table_at = body.index('  spaced  ') + 1
+    with_tables = list(extraction.iter_docx_paragraphs(rich_docx, tables=True))
+    assert with_tables == body[:table_at] + ['cell A', '', '', 'cell D'] + body[table_at:]
+
+    with_headers = list(extraction.iter_docx_paragraphs(rich_docx, headers=True))
+    assert with_headers[0] == 'Header line'
+    assert with_headers[-len(body):] == body
+
+
+def test_empty_document(tmp_path):
+    path = tmp_path / 'empty.docx'
+    docx.Document().save(path)
+    assert list(extraction.iter_docx_paragraphs(str(path))) == python_docx_paragraphs(str(path))
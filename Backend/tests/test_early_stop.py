@@ -0,0 +1,29 @@
+"""Early stopping must not wait on the ML branch before it needs the threshold."""
+
+TEXT = ' '.join(f'This is sentence number {i} and it is long enough to be scored separately by the model.'
+                for i in range(120))
+
+
+def test_ml_probability_requested_only_at_first_bound_check(app_module, bundle, monkeypatch):
+    monkeypatch.setattr(app_module, 'EARLY_STOP_BATCH', 8)
+    monkeypatch.setattr(app_module, 'EARLY_STOP_MIN_CHUNKS', 24)
+    doc = app_module.DocumentScore(bundle, TEXT)
+    scored_when_asked = []
+
+    def ml_prob():
+        scored_when_asked.append(doc.scored)
+        return 0.5
+
+    app_module.score_early_stop(doc, ml_prob)
+    assert scored_when_asked == [24]
+
+
+def test_ml_probability_not_requested_for_short_documents(app_module, bundle, monkeypatch):
+    monkeypatch.setattr(app_module, 'EARLY_STOP_MIN_CHUNKS', 32)
+    doc = app_module.DocumentScore(bundle, TEXT[:2000])
+
+    def ml_prob():
+        raise AssertionError('threshold not needed below EARLY_STOP_MIN_CHUNKS')
+
+    app_module.score_early_stop(doc, ml_prob)
+    assert doc.complete and not doc.stopped_early
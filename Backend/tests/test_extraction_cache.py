@@ -0,0 +1,37 @@
+"""The shared extraction cache must only trust a directory nobody else can write to."""
+
+import os
+
+import pytest
+
+
+def test_disk_cache_creates_private_directory(app_module, tmp_path):
+    cache = app_module.DiskCache(str(tmp_path / 'extraction'), 1024 * 1024)
+    cache.put('key', {'text': 'hello'})
+
+    assert os.stat(tmp_path / 'extraction').st_mode & 0o777 == 0o700
+    assert cache.get('key') == {'text': 'hello'}
+
+
+def test_disk_cache_refuses_shared_directory(app_module, tmp_path):
+    directory = tmp_path / 'extraction'
+    directory.mkdir()
+    (directory / 'key.json').write_text('{"text": "planted"}')
+    os.chmod(directory, 0o777)
+
+    cache = app_module.DiskCache(str(directory), 1024 * 1024)
+    assert cache.get('key') is None
+    cache.put('other', {'text': 'hello'})
+    assert not (directory / 'other.json').exists()
+    assert cache.stats()['enabled'] is False
+
+
+@pytest.mark.skipif(not hasattr(os, 'getuid') or os.getuid() != 0, reason='needs root to chown')
+def test_disk_cache_refuses_directory_owned_by_someone_else(app_module, tmp_path):
+    directory = tmp_path / 'extraction'
+    directory.mkdir(mode=0o700)
+    (directory / 'key.json').write_text('{"text": "planted"}')
+    os.chown(directory, 65534, -1)
+
+    cache = app_module.DiskCache(str(directory), 1024 * 1024)
+    assert cache.get('key') is None
@@ -0,0 +1,97 @@
+"""FeatureAssembler must give the ML ensemble exactly the row the pandas path builds."""
+
+import numpy as np
+import pytest
+
+from conftest import ML_TRAINING_TEXTS, ml_frame
+
+TEXTS = [
+    "Short.",
+    "",
+    "The quick brown fox jumps over the lazy dog. " * 20,
+    "Numbers 123 and 4,567.89; UPPER case words?! And sample text number 3 with words 0 1 2.",
+    "Unseen vocabulary only: zebra quokka axolotl",
+    ML_TRAINING_TEXTS[17],
+]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_assembler_matches_pandas_row(app_module, ml_models, text):
+    _, scaler, tfidf, names = ml_models
+    assembler = app_module.FeatureAssembler(scaler, tfidf, names)
+    assert assembler.affine
+
+    expected = scaler.transform(ml_frame(app_module, tfidf, [text]))
+    got = assembler.transform(text, app_module.extract_text_features(text))
+    np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_assembler_falls_back_for_non_affine_scaler(app_module, ml_models):
+    from sklearn.preprocessing import QuantileTransformer
+
+    _, _, tfidf, names = ml_models
+    scaler = QuantileTransformer(n_quantiles=50).fit(ml_frame(app_module, tfidf, ML_TRAINING_TEXTS))
+    assembler = app_module.FeatureAssembler(scaler, tfidf, names)
+    assert not assembler.affine
+
+    for text in TEXTS:
+        expected = scaler.transform(ml_frame(app_module, tfidf, [text]))
+        got = assembler.transform(text, app_module.extract_text_features(text))
+        np.testing.assert_allclose(got, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_ml_branch_same_probability_with_and_without_assembler(app_module, bundle):
+    for text in TEXTS:
+        with_assembler = app_module.ml_branch(bundle, text)
+        assembler, bundle.assembler = bundle.assembler, None
+        try:
+            without = app_module.ml_branch(bundle, text)
+        finally:
+            bundle.assembler = assembler
+        assert with_assembler == pytest.approx(without, abs=1e-12)
+
+
+def reference_text_features(text):
+    """extract_text_features as it was before the single-pass Counter rewrite"""
+    if not isinstance(text, str):
+        text = str(text)
+    words = text.split()
+    word_count = len(words)
+    return {
+        'text_length': len(text),
+        'word_count': word_count,
+        'avg_word_length': np.mean([len(w) for w in words]) if words else 0,
+        'unique_word_ratio': len(set(words)) / word_count if word_count > 0 else 0,
+        'upper_case_ratio': sum(1 for c in text if c.isupper()) / len(text) if text else 0,
+        'digit_freq': sum(1 for c in text if c.isdigit()) / len(text) if text else 0,
+        'punc_freq': sum(1 for c in text if c in '.,!?;:') / len(text) if text else 0,
+        'exclamation_count': text.count('!'),
+        'question_count': text.count('?'),
+        'comma_count': text.count(','),
+        'period_count': text.count('.'),
+        'avg_sentence_length': word_count / max(text.count('.') + text.count('!') + text.count('?'), 1),
+    }
+
+
+def fuzzed_texts(count, seed=0):
+    rng = np.random.default_rng(seed)
+    alphabet = list("abcXYZ019 .,!?;:\n\t'\"-") + ['é', 'Ä', '٣', 'ß', ' ', '²']
+    return [''.join(rng.choice(alphabet, size=rng.integers(0, 300))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('text', TEXTS + fuzzed_texts(50) + [12345, None])
+def test_text_features_match_reference(app_module, text):
+    expected = reference_text_features(text)
+    got = app_module.extract_text_features(text)
+    assert list(got) == app_module.TEXT_FEATURE_NAMES == list(expected)
+    for name in expected:
+        assert got[name] == pytest.approx(expected[name], rel=1e-12, abs=1e-12), name
+
+
+def test_batch_features_match_single(app_module):
+    texts = TEXTS + fuzzed_texts(50, seed=1)
+    batch = app_module.extract_text_features_batch(texts)
+    assert batch.shape == (len(texts), len(app_module.TEXT_FEATURE_NAMES))
+    for row, text in zip(batch, texts):
+        single = app_module.extract_text_features(text)
+        np.testing.assert_array_equal(row, [single[name] for name in app_module.TEXT_FEATURE_NAMES])
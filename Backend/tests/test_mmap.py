@@ -0,0 +1,33 @@
+"""Memory-mapped RoBERTa weights must give the model that from_pretrained() loads."""
+
+import pytest
+
+
+def test_mmap_model_matches_from_pretrained(app_module, tiny_roberta, tmp_path):
+    torch = pytest.importorskip('torch')
+    from transformers import AutoModelForSequenceClassification
+
+    tokenizer, model = tiny_roberta
+    model.save_pretrained(tmp_path, safe_serialization=True)
+
+    mapped = app_module.load_mmap_model(str(tmp_path))
+    assert not any(p.is_meta for p in mapped.parameters())
+    assert not any(b.is_meta for b in mapped.buffers())
+
+    reference = AutoModelForSequenceClassification.from_pretrained(tmp_path).eval()
+    inputs = tokenizer(["A short sentence.", "Another, somewhat longer sentence to pad against."],
+                       return_tensors='pt', padding=True)
+    with torch.no_grad():
+        assert torch.equal(mapped(**inputs).logits, reference(**inputs).logits)
+
+
+def test_mmap_model_rejects_incomplete_weights(app_module, tiny_roberta, tmp_path):
+    from safetensors.torch import save_file
+
+    _, model = tiny_roberta
+    model.config.save_pretrained(tmp_path)
+    state = {k: v.contiguous() for k, v in model.state_dict().items() if not k.startswith('classifier.')}
+    save_file(state, str(tmp_path / 'model.safetensors'))
+
+    with pytest.raises(ValueError, match='missing'):
+        app_module.load_mmap_model(str(tmp_path))
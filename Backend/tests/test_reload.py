@@ -0,0 +1,69 @@
+"""Hot reloads must never swap in a bundle that lost a model, and must reach every worker."""
+
+import os
+
+import pytest
+
+
+@pytest.fixture
+def loaded(app_module, bundle, tiny_roberta, monkeypatch):
+    """The test bundle marked as fully loaded, with model loading stubbed to reuse the test models"""
+    for name in bundle.status:
+        monkeypatch.setitem(bundle.status, name, {'state': 'ready', 'load_time_s': 0.0, 'error': None})
+
+    def load_roberta(new):
+        new.tokenizer, new.model = tiny_roberta
+        new._set_status('roberta', 'ready')
+
+    monkeypatch.setattr(app_module, 'load_roberta', load_roberta)
+    monkeypatch.setattr(app_module, 'model_files_signature', lambda source: {'roberta': [source], 'ml_ensemble': ['v2']})
+    monkeypatch.setattr(app_module.model_registry, 'failed_signature', None)
+    return bundle
+
+
+def test_failed_ml_artifact_keeps_old_version_serving(app_module, loaded, monkeypatch):
+    def load_ml_ensemble(new):
+        new._set_status('ml_ensemble', 'failed', error='ensemble.pkl is truncated')
+
+    monkeypatch.setattr(app_module, 'load_ml_ensemble', load_ml_ensemble)
+
+    assert app_module.model_registry.reload() is False
+    assert app_module.model_registry.current() is loaded
+    assert not loaded.retired and loaded.ensemble is not None
+    assert 'ml_ensemble failed' in app_module.model_registry.reloads['last_error']
+    assert app_module.model_registry.failed_signature == {'roberta': [loaded.roberta_source], 'ml_ensemble': ['v2']}
+
+    response = app_module.app.test_client().post('/predict', json={'text': 'Still served by the old models. ' * 5})
+    assert response.status_code == 200
+    assert response.get_json()['breakdown']['model_version'] == 'tests'
+
+
+def test_reload_request_reaches_forked_worker(app_module):
+    fanout = app_module.ReloadFanout()
+    assert fanout.latest() == (0, None)
+
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        # The child waits for the parent's request, then proves it cannot take the
+        # reload lock while the parent holds it
+        import fcntl
+        while fanout.latest()[0] == 0:
+            pass
+        generation, source = fanout.latest()
+        try:
+            fcntl.lockf(fanout._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, fanout.RELOAD_LOCK)
+            locked_out = False
+        except OSError:
+            locked_out = True
+        os.write(write_end, f"{generation} {source} {locked_out}".encode())
+        os._exit(0)
+
+    os.close(write_end)
+    with fanout.exclusive():
+        assert fanout.publish('finetuned') == 1
+        reply = os.read(read_end, 1024).decode()
+    os.waitpid(pid, 0)
+    os.close(read_end)
+    assert reply == '1 finetuned True'
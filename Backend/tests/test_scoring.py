@@ -0,0 +1,41 @@
+"""Length-bucketed mini-batches must score every chunk as if it went through the model alone."""
+
+import pytest
+
+TEXT = " ".join(
+    f"Sentence {i} says {'something rather longer than the one before it, ' * (i % 5)}and then it ends{'.!?'[i % 3]}"
+    for i in range(40)
+)
+
+
+def one_by_one(app, models, encoded):
+    torch = pytest.importorskip('torch')
+    probs = []
+    with torch.no_grad():
+        for ids in encoded:
+            logits = models.model(input_ids=torch.tensor([ids]), attention_mask=torch.ones(1, len(ids), dtype=torch.long)).logits
+            probs.append(torch.softmax(logits, dim=-1)[0, 1].item())
+    return probs
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 16, 64])
+def test_score_chunks_matches_one_by_one(app_module, bundle, batch_size):
+    encoded, _ = app_module.prepare_chunks(bundle, TEXT)
+    assert len({len(ids) for ids in encoded}) > 1, "chunks should need padding"
+
+    expected = one_by_one(app_module, bundle, encoded)
+    got = app_module.score_chunks(bundle, encoded, batch_size=batch_size)
+    assert got == pytest.approx(expected, abs=1e-6)
+
+
+def test_document_score_matches_one_by_one(app_module, bundle):
+    doc = app_module.DocumentScore(bundle, TEXT)
+    doc.score()
+    assert doc.probs == pytest.approx(one_by_one(app_module, bundle, doc.encoded), abs=1e-6)
+
+
+def test_cancelled_document_stops_scoring(app_module, bundle):
+    doc = app_module.DocumentScore(bundle, TEXT)
+    doc.cancel.set()
+    doc.score()
+    assert doc.scored == 0
@@ -0,0 +1,44 @@
+"""A cached sentence probability must be exactly what scoring the document cold would give."""
+
+import pytest
+
+FIRST = "The opening sentence of the document runs comfortably past fifty characters."
+SHARED = "Artificial intelligence has transformed many industries in recent years, the quick brown fox says."
+
+
+@pytest.mark.parametrize('cold, warm_first', [
+    (FIRST + "\n" + SHARED, FIRST + " " + SHARED),
+    (FIRST + " " + SHARED, FIRST + "\n" + SHARED),
+])
+def test_same_sentence_in_another_context_is_not_reused(app_module, bundle, monkeypatch, cold, warm_first):
+    encoded = [app_module.prepare_chunks(bundle, text)[0][1] for text in (cold, warm_first)]
+    assert encoded[0] != encoded[1], "the context should change the shared sentence's token ids"
+
+    expected = app_module.analyze_text(bundle, cold)
+
+    monkeypatch.setattr(app_module, 'sentence_cache', app_module.LRUCache(1000))
+    app_module.analyze_text(bundle, warm_first)
+    got = app_module.analyze_text(bundle, cold)
+
+    assert got['breakdown']['roberta_prob'] == expected['breakdown']['roberta_prob']
+    assert got['breakdown']['sentences_reused'] == 1   # FIRST opens both documents
+
+
+def test_same_context_is_reused(app_module, bundle):
+    text = FIRST + " " + SHARED
+    expected = app_module.analyze_text(bundle, text)
+    got = app_module.analyze_text(bundle, text + " And one more sentence that is long enough to be scored.")
+    assert got['breakdown']['sentences_reused'] == 2
+    assert got['sentence_scores'][:2] == expected['sentence_scores']
+
+
+def test_key_survives_ml_ensemble_reload(app_module, bundle, monkeypatch):
+    ids = app_module.prepare_chunks(bundle, FIRST)[0][0]
+    key = app_module.sentence_cache_key(bundle, ids)
+
+    monkeypatch.setattr(bundle, 'ml_version', 'retrained')
+    monkeypatch.setattr(bundle, 'version', 'retrained-bundle')
+    assert app_module.sentence_cache_key(bundle, ids) == key
+
+    monkeypatch.setattr(bundle, 'roberta_version', 'new-roberta')
+    assert app_module.sentence_cache_key(bundle, ids) != key
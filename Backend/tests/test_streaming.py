@@ -0,0 +1,136 @@
+"""Streamed PDF scoring must reach exactly the verdict of scoring the extracted text in one go."""
+
+import io
+import random
+
+import pytest
+
+WORDS = ("the quick brown fox jumps over lazy dog artificial intelligence "
+         "transformed industries hello world résumé naïve").split()
+SEPARATORS = [' ', '  ', '\n', ' \n ', '\r\n', '\t']
+
+
+def fuzzed_pages(seed, sentences=120, cuts=30):
+    """A document of random sentences split into pages at random character offsets"""
+    rng = random.Random(seed)
+    body = ''.join(
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+        + rng.choice(['.', '!', '?', '...']) + rng.choice(SEPARATORS)
+        for _ in range(sentences)
+    )
+    full = rng.choice(['', '  \n']) + body + rng.choice(['', 'trailing fragment without an end'])
+    offsets = sorted(rng.sample(range(1, len(full)), cuts))
+    return [full[a:b] for a, b in zip([0] + offsets, offsets + [len(full)])]
+
+
+def joined_text(app, pages):
+    """The document text predict_file scores: normalized pages, stripped"""
+    return ''.join(app.normalize_text(page + '\n') for page in pages).strip()
+
+
+@pytest.fixture
+def fake_pdf(app_module, monkeypatch):
+    """Make PDF extraction return the given pages instead of parsing the upload"""
+    def install(pages):
+        monkeypatch.setattr(app_module, 'pdf_page_texts',
+                            lambda source, timings=None: (app_module.normalize_text(p + '\n') for p in pages))
+    return install
+
+
+@pytest.fixture
+def scored_chunks(app_module, monkeypatch):
+    """Number of chunks that went through the model"""
+    counter = {'chunks': 0}
+    score_chunks = app_module.score_chunks
+
+    def counting(models, encoded, batch_size=None):
+        counter['chunks'] += len(encoded)
+        return score_chunks(models, encoded, batch_size)
+
+    monkeypatch.setattr(app_module, 'score_chunks', counting)
+    return counter
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_sentence_stream_matches_sentence_spans(app_module, seed):
+    pages = fuzzed_pages(seed)
+    text = joined_text(app_module, pages)
+
+    stream = app_module.SentenceStream()
+    streamed = []
+    for page in pages:
+        streamed += stream.feed(app_module.normalize_text(page + '\n'))
+    streamed += stream.close()
+
+    assert [sentence for _, sentence in streamed] == [text[a:b] for a, b in app_module.sentence_spans(text)]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_encode_sentences_matches_prepare_chunks(app_module, bundle, seed):
+    pages = fuzzed_pages(seed)
+    text = joined_text(app_module, pages)
+    stream = app_module.SentenceStream()
+    streamed = [s for page in pages for s in stream.feed(app_module.normalize_text(page + '\n'))] + stream.close()
+
+    encoded, spans = app_module.prepare_chunks(bundle, text)
+    sentence_chunks = [ids for ids, span in zip(encoded, spans) if span is not None]
+    assert app_module.encode_sentences(bundle, streamed) == sentence_chunks
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_streaming_verdict_identical(app_module, bundle, fake_pdf, monkeypatch, seed):
+    pages = fuzzed_pages(seed)
+    text = joined_text(app_module, pages)
+    expected = app_module.analyze_text(bundle, text)
+
+    # Nothing may come through the shared sentence cache
+    monkeypatch.setattr(app_module, 'sentence_cache', app_module.LRUCache(0))
+    fake_pdf(pages)
+    prescored = {}
+    streamed_text = ''.join(app_module.stream_pdf_text(bundle, b'%PDF', prescored)).strip()
+    assert streamed_text == text
+
+    got = app_module.analyze_text(bundle, text, prescored=prescored)
+    assert got['ai_probability'] == expected['ai_probability']
+    assert got['sentence_scores'] == expected['sentence_scores']
+    assert got['breakdown']['sentences_computed'] == expected['breakdown']['sentences_computed']
+    assert got['breakdown']['sentences_reused'] == 0
+
+
+def test_upload_scores_each_sentence_once_without_sentence_cache(app_module, bundle, fake_pdf, scored_chunks, monkeypatch):
+    monkeypatch.setattr(app_module, 'sentence_cache', app_module.LRUCache(0))
+    pages = fuzzed_pages(11)
+    fake_pdf(pages)
+    sentences = len(app_module.sentence_spans(joined_text(app_module, pages)))
+
+    client = app_module.app.test_client()
+    response = client.post('/predict-file', data={'file': (io.BytesIO(b'%PDF-1.4 fuzzed'), 'doc.pdf')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    breakdown = response.get_json()['breakdown']
+    assert breakdown['sentences_computed'] == sentences
+    assert breakdown['sentences_reused'] == 0
+    # Every sentence once while streaming, plus the whole-text chunk
+    assert scored_chunks['chunks'] == sentences + 1
+
+
+def test_stream_reuses_cached_sentences(app_module, bundle, fake_pdf):
+    pages = fuzzed_pages(5)
+    app_module.analyze_text(bundle, joined_text(app_module, pages))
+
+    fake_pdf(pages)
+    prescored = {}
+    text = ''.join(app_module.stream_pdf_text(bundle, b'%PDF', prescored)).strip()
+    breakdown = app_module.analyze_text(bundle, text, prescored=prescored)['breakdown']
+    assert breakdown['sentences_computed'] == 0
+    assert breakdown['sentences_reused'] == len(app_module.sentence_spans(text))
+
+
+def test_stream_extraction_error_propagates(app_module, bundle, monkeypatch):
+    def pages(source, timings=None):
+        yield 'A fine first page sentence that is certainly longer than fifty characters. '
+        raise ValueError('broken page')
+
+    monkeypatch.setattr(app_module, 'pdf_page_texts', pages)
+    with pytest.raises(ValueError, match='broken page'):
+        app_module.stream_pdf_text(bundle, b'%PDF', {})
@@ -119,7 +119,7 @@ Type=simple
 User=ubuntu
 WorkingDirectory=$APP_DIR/Backend
 Environment="PATH=$APP_DIR/Backend/venv/bin"
-ExecStart=$APP_DIR/Backend/venv/bin/python app.py
+ExecStart=$APP_DIR/Backend/venv/bin/gunicorn --config gunicorn.conf.py app:app
 Restart=always
 RestartSec=10
 StandardOutput=journal